@@ -1,10 +1,13 @@
+import codecs
+import json
 from abc import ABC, abstractmethod
+from html.parser import HTMLParser
 
-import httpx
-from bs4 import BeautifulSoup
 from loguru import logger
 
-from app.SERVICE.schemas import ProductInDB, Supplier, WebResponseType
+from app.app_services.http_pool import get_http_pool
+from app.app_services.schemas import ProductInDB, Supplier, WebResponseType
+from app.app_services.transfer import NotModified, open_stream
 
 
 def parse_product_item(item: dict, supplier: Supplier) -> ProductInDB | None:
@@ -27,24 +30,33 @@ def parse_product_item(item: dict, supplier: Supplier) -> ProductInDB | None:
 
 class FetchStrategy(ABC):
     @abstractmethod
-    async def fetch(self, supplier: Supplier) -> list[ProductInDB]:
-        pass
+    async def fetch(self, supplier: Supplier) -> list[ProductInDB] | None:
+        """Ambil produk supplier. Return None kalau fetch gagal, bukan list kosong.
+
+        Raise `NotModified` kalau isi supplier tidak berubah sejak fetch terakhir.
+        """
 
 
 class JsonFetchStrategy(FetchStrategy):
-    async def fetch(self, supplier: Supplier) -> list[ProductInDB]:
+    async def fetch(self, supplier: Supplier) -> list[ProductInDB] | None:
         if supplier.mapping is None:
             logger.warning(f"[{supplier.name}] mapping kosong, skip.")
-            return []
+            return None
 
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with get_http_pool().acquire() as client:
             try:
-                resp = await client.get(str(supplier.url_harga))
-                resp.raise_for_status()
-                data = resp.json()
+                body = bytearray()
+                async with open_stream(
+                    client, str(supplier.url_harga), supplier.name
+                ) as stream:
+                    async for chunk in stream:
+                        body += chunk
+                data = json.loads(body)
+            except NotModified:
+                raise
             except Exception as e:
                 logger.error(f"[{supplier.name}] gagal fetch JSON: {e}")
-                return []
+                return None
 
         # Kalau bentuk dict tapi key `data`, ambil isi nya
         items = data.get("data", data) if isinstance(data, dict) else data
@@ -57,52 +69,145 @@ class JsonFetchStrategy(FetchStrategy):
         return products
 
 
+class TabelRowParser(HTMLParser):
+    """Parser incremental untuk baris `table.tabel`, bisa di-feed per chunk.
+
+    Teks tiap sel di-strip lalu digabung, sama seperti `get_text(strip=True)`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: list[list[str]] = []
+        self._tables: list[bool] = []
+        self._row: list[str] | None = None
+        self._cell: list[str] | None = None
+        # satu text node bisa terpotong di batas chunk, strip setelah tag berikutnya
+        self._text: list[str] = []
+
+    @property
+    def _in_tabel(self) -> bool:
+        return any(self._tables)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == "table":
+            classes = (dict(attrs).get("class") or "").split()
+            self._tables.append("tabel" in classes)
+        elif tag == "tr" and self._in_tabel:
+            self._close_row()
+            self._row = []
+        elif tag == "td" and self._row is not None:
+            self._close_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag == "td":
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "table" and self._tables:
+            self._close_row()
+            self._tables.pop()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._text.append(data)
+
+    def _flush_text(self):
+        text = "".join(self._text).strip()
+        self._text = []
+        if text and self._cell is not None:
+            self._cell.append(text)
+
+    def _close_cell(self):
+        self._flush_text()
+        if self._cell is not None and self._row is not None:
+            self._row.append("".join(self._cell))
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append(self._row)
+        self._row = None
+
+    def close(self):
+        super().close()
+        # halaman terpotong tanpa </table>, baris terakhir tetap dipakai
+        self._close_row()
+        self._tables = []
+
+    def pop_rows(self) -> list[list[str]]:
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def html_row_to_item(cols: list[str], supplier: Supplier) -> dict | None:
+    """Ubah satu baris tabel (kode, deskripsi, harga, status) ke dict sesuai mapping."""
+    if supplier.mapping is None:
+        return None
+    if len(cols) != 4 or cols[0].lower() == "kode":
+        return None
+    harga_key = supplier.mapping.get("harga", "harga")
+    item = {
+        supplier.mapping.get("kode", "kode"): cols[0],
+        supplier.mapping.get("deskripsi", "deskripsi"): cols[1],
+        harga_key: cols[2].replace(".", "").replace(",", ""),
+        supplier.mapping.get("status", "status"): cols[3],
+    }
+    # harga conversion
+    try:
+        harga_val = item[harga_key]
+        harga_int = (
+            int(float(harga_val))
+            if harga_val.isdigit() or harga_val.replace(".", "").isdigit()
+            else 0
+        )
+        item[harga_key] = str(harga_int)
+    except Exception:
+        item[harga_key] = "0"
+    return item
+
+
 class HtmlFetchStrategy(FetchStrategy):
-    async def fetch(self, supplier: Supplier) -> list[ProductInDB]:
+    async def fetch(self, supplier: Supplier) -> list[ProductInDB] | None:
         if supplier.mapping is None:
             logger.warning(f"[{supplier.name}] mapping kosong, skip.")
-            return []
-        async with httpx.AsyncClient(timeout=15) as client:
-            try:
-                resp = await client.get(str(supplier.url_harga))
-                resp.raise_for_status()
-            except Exception as e:
-                logger.error(f"[{supplier.name}] gagal fetch HTML: {e}")
-                return []
+            return None
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+        parser = TabelRowParser()
         products: list[ProductInDB] = []
 
-        for row in soup.select("table.tabel tr"):
-            cols = row.find_all("td")
-            if len(cols) == 4 and cols[0].get_text(strip=True).lower() != "kode":
-                item = {
-                    supplier.mapping.get("kode", "kode"): cols[0].get_text(strip=True),
-                    supplier.mapping.get("deskripsi", "deskripsi"): cols[1].get_text(
-                        strip=True
-                    ),
-                    supplier.mapping.get("harga", "harga"): cols[2]
-                    .get_text(strip=True)
-                    .replace(".", "")
-                    .replace(",", ""),
-                    supplier.mapping.get("status", "status"): cols[3].get_text(
-                        strip=True
-                    ),
-                }
-                # harga conversion
-                try:
-                    harga_val = item[supplier.mapping.get("harga", "harga")]
-                    harga_int = (
-                        int(float(harga_val))
-                        if harga_val.isdigit() or harga_val.replace(".", "").isdigit()
-                        else 0
-                    )
-                    item[supplier.mapping.get("harga", "harga")] = str(harga_int)
-                except Exception:
-                    item[supplier.mapping.get("harga", "harga")] = "0"
+        def consume_rows() -> None:
+            for cols in parser.pop_rows():
+                item = html_row_to_item(cols, supplier)
+                if item is None:
+                    continue
                 product = parse_product_item(item, supplier)
                 if product:
                     products.append(product)
+
+        async with get_http_pool().acquire() as client:
+            try:
+                async with open_stream(
+                    client, str(supplier.url_harga), supplier.name
+                ) as stream:
+                    # Decode teks per chunk, baris yang sudah lengkap langsung diparse
+                    text_decoder = codecs.getincrementaldecoder(stream.charset)(
+                        errors="replace"
+                    )
+                    async for chunk in stream:
+                        parser.feed(text_decoder.decode(chunk))
+                        consume_rows()
+                    parser.feed(text_decoder.decode(b"", final=True))
+                    parser.close()
+                    consume_rows()
+            except NotModified:
+                raise
+            except Exception as e:
+                logger.error(f"[{supplier.name}] gagal fetch HTML: {e}")
+                return None
         return products
 
 
@@ -118,5 +223,5 @@ class FetchContext:
                 f"Tipe response {supplier.web_response_type} belum didukung."
             )
 
-    async def fetch(self, supplier: Supplier) -> list[ProductInDB]:
+    async def fetch(self, supplier: Supplier) -> list[ProductInDB] | None:
         return await self._strategy.fetch(supplier)
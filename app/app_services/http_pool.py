@@ -0,0 +1,122 @@
+"""pool HTTP bersama untuk semua fetch supplier.
+
+ukuran pool dan batas concurrency mengikuti section `FETCH` di settings dan bisa
+berubah saat aplikasi jalan. client lama tidak langsung ditutup, tapi setelah
+request yang masih memakainya selesai.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+from loguru import logger
+
+from app.config.settings import SettingsChanged, get_settings_manager
+from app.config.values import ConfigFetcher
+
+
+class ResizableLimiter:
+    """Semaphore yang batasnya bisa diubah tanpa membuat ulang."""
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def __aenter__(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self._limit)
+            self._active += 1
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    async def resize(self, limit: int) -> None:
+        async with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+
+def _build_client(cfg: ConfigFetcher) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=cfg.timeout,
+        limits=httpx.Limits(
+            max_connections=cfg.max_connections,
+            max_keepalive_connections=cfg.max_keepalive,
+        ),
+    )
+
+
+class HttpPool:
+    def __init__(self, cfg: ConfigFetcher):
+        self._cfg = cfg
+        self._client = _build_client(cfg)
+        self.limiter = ResizableLimiter(cfg.concurrency)
+        self._in_use: dict[httpx.AsyncClient, int] = {}
+        self._retired: set[httpx.AsyncClient] = set()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Ambil client aktif, dibatasi oleh limiter concurrency."""
+        async with self.limiter:
+            client = self._client
+            self._in_use[client] = self._in_use.get(client, 0) + 1
+            try:
+                yield client
+            finally:
+                self._in_use[client] -= 1
+                if not self._in_use[client]:
+                    del self._in_use[client]
+                    if client in self._retired:
+                        self._retired.discard(client)
+                        await client.aclose()
+
+    async def apply(self, cfg: ConfigFetcher) -> None:
+        """Terapkan konfigurasi baru tanpa memutus request yang sedang jalan."""
+        old_cfg, self._cfg = self._cfg, cfg
+        if (old_cfg.timeout, old_cfg.max_connections, old_cfg.max_keepalive) != (
+            cfg.timeout,
+            cfg.max_connections,
+            cfg.max_keepalive,
+        ):
+            old, self._client = self._client, _build_client(cfg)
+            if old in self._in_use:
+                self._retired.add(old)
+            else:
+                await old.aclose()
+            logger.info(
+                f"http pool diganti: max_connections={cfg.max_connections}, "
+                f"max_keepalive={cfg.max_keepalive}, timeout={cfg.timeout}"
+            )
+        if old_cfg.concurrency != cfg.concurrency:
+            await self.limiter.resize(cfg.concurrency)
+            logger.info(f"concurrency fetch diubah ke {cfg.concurrency}")
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+        for client in self._retired:
+            await client.aclose()
+        self._retired.clear()
+
+
+_http_pool: HttpPool | None = None
+
+
+def get_http_pool() -> HttpPool:
+    global _http_pool
+    if _http_pool is None:
+        manager = get_settings_manager()
+        _http_pool = HttpPool(manager.current.FETCH)
+
+        async def on_change(event: SettingsChanged) -> None:
+            await _http_pool.apply(event.new)  # type: ignore[union-attr,arg-type]
+
+        manager.subscribe("FETCH", on_change)
+    return _http_pool
@@ -1,16 +1,38 @@
-"""experiment scrapping using request and beautifulsoup4.
+"""experiment scrapping using httpx and a streaming html parser.
 
 the goal is to get the data from the url and save to file (later its will be saved to db).
 """
 
 import asyncio
+import hashlib
+import io
 import json
+import sys
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
+import numpy as np
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from loguru import logger
 
-from app.SERVICE.fetch_strategy import FetchContext, WebResponseType
-from app.SERVICE.schemas import Supplier
+from app.app_services.fetch_strategy import FetchContext, WebResponseType
+from app.app_services.http_pool import get_http_pool
+from app.app_services.price_archive import PriceArchive
+from app.app_services.price_guard import (
+    GuardHold,
+    accept_all,
+    accepted_snapshot,
+    accepted_snapshot_ids,
+    apply_hold,
+    check_snapshot,
+)
+from app.app_services.schemas import ProductInDB, Supplier
+from app.app_services.transfer import NotModified, commit_etag, log_transfer_summary
+from app.config.settings import SettingsChanged, get_settings, get_settings_manager
+from app.config.values import ConfigFetcher
+from app.db.app_session import init_app_db
+from app.db.kode_registry import KodeRegistry
+from app.db.outbox import OutboxPusher, enqueue_deltas
 
 
 # --- Supplier Samples --------------------------------------------------------
@@ -55,21 +77,185 @@ def sample_supplier_html() -> Supplier:
 
 
 # --- Core Logic --------------------------------------------------------------
-async def fetch_and_save(supplier: Supplier, save_dir: Path) -> None:
-    """Fetch data dari supplier dan simpan ke file JSON."""
+def load_snapshot(path: Path) -> tuple[list[ProductInDB], str]:
+    """Baca snapshot sebelumnya dan digest isinya, kosong kalau belum ada."""
+    if not path.exists():
+        return [], ""
+    data = path.read_bytes()
+    products = [ProductInDB(**item) for item in json.loads(data)]
+    return products, hashlib.sha1(data).hexdigest()
+
+
+def _alias_key(supplier: Supplier) -> str:
+    return json.dumps(supplier.kode_aliases(), sort_keys=True)
+
+
+def load_snapshot_ids(path: Path, digest: str, supplier: Supplier) -> np.ndarray | None:
+    """Id kode snapshot lama, None kalau file id bukan milik snapshot itu."""
+    if not digest or not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            ids, saved_digest, aliases = data["ids"], data["digest"], data["aliases"]
+    except Exception as e:
+        logger.warning(f"[{supplier.name}] file id kode {path} tidak terbaca: {e}")
+        return None
+    if str(saved_digest) != digest or str(aliases) != _alias_key(supplier):
+        return None
+    return ids
+
+
+def load_hold(path: Path) -> GuardHold:
+    """Hitungan observasi yang ditahan, kosong kalau belum ada atau rusak."""
+    if not path.exists():
+        return GuardHold()
+    try:
+        return GuardHold.model_validate_json(path.read_bytes())
+    except Exception as e:
+        logger.warning(f"file hold {path} tidak terbaca, hitungan diulang: {e}")
+        return GuardHold()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
+
+async def fetch_and_save(
+    supplier: Supplier,
+    save_dir: Path,
+    archive: PriceArchive | None = None,
+    registry: KodeRegistry | None = None,
+) -> None:
+    """Fetch data dari supplier, validasi, simpan ke file JSON, dan antrikan delta ke outbox."""
+    fetched_at = datetime.now()
     fetch_ctx = FetchContext(supplier)
-    products = await fetch_ctx.fetch(supplier)
+    try:
+        products = await fetch_ctx.fetch(supplier)
+    except NotModified:
+        logger.info(f"[{supplier.name}] harga tidak berubah (304), skip")
+        return
+    if products is None:
+        # fetch gagal, bukan supplier yang kosong: snapshot lama tidak disentuh
+        logger.error(f"[{supplier.name}] fetch gagal, snapshot lama dipertahankan")
+        return
 
     logger.info(f"[{supplier.name}] total produk: {len(products)}")
 
+    slug = supplier.name.replace(" ", "_").lower()
+    save_path = save_dir / f"{slug}.json"
+    ids_path = save_dir / f"{slug}.ids.npz"
+    previous, previous_digest = load_snapshot(save_path)
+
+    # Validasi dulu sebelum ditulis, delta mencurigakan masuk karantina
+    # Kode dinormalisasi ke id global supaya join snapshot memakai int. Id
+    # snapshot lama disimpan bersama snapshot, jadi tidak perlu di-intern ulang.
+    current_ids = previous_ids = None
+    if registry is not None:
+        current_ids = await registry.intern_many((p.kode for p in products), supplier)
+        previous_ids = load_snapshot_ids(ids_path, previous_digest, supplier)
+        if previous_ids is None:
+            previous_ids = await registry.intern_many(
+                (p.kode for p in previous), supplier
+            )
+    guard = get_settings().GUARD
+    report = check_snapshot(previous, products, guard, current_ids, previous_ids)
+
+    # Yang ditahan dilepas kalau operator menyetujui (file `<slug>.accept`) atau
+    # nilai yang sama sudah terlihat beberapa kali berturut-turut.
+    quarantine_dir = save_dir / "quarantine"
+    hold_path = quarantine_dir / f"{slug}.hold.json"
+    accept_path = quarantine_dir / f"{slug}.accept"
+    if accept_path.exists():
+        logger.warning(f"[{supplier.name}] snapshot disetujui operator ({accept_path})")
+        report, hold = accept_all(report), GuardHold()
+    else:
+        report, hold = apply_hold(
+            report, load_hold(hold_path), products, guard.rebaseline_after
+        )
+    if report.quarantined:
+        quarantine_dir.mkdir(exist_ok=True)
+        quarantine_path = quarantine_dir / f"{slug}.json"
+        with open(quarantine_path, "w", encoding="utf-8") as f:
+            json.dump(
+                [q.model_dump(mode="json") for q in report.quarantined],
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        logger.warning(
+            f"[{supplier.name}] {len(report.quarantined)} delta dikarantina "
+            f"ke {quarantine_path} ({len(hold.jumps)} lonjakan menunggu, snapshot "
+            f"ditahan {hold.snapshot_seen}x/{guard.rebaseline_after})"
+        )
+    if report.blocked:
+        quarantine_dir.mkdir(exist_ok=True)
+        _write_atomic(hold_path, hold.model_dump_json().encode())
+        logger.error(
+            f"[{supplier.name}] snapshot ditahan ({', '.join(report.snapshot_flags)}), "
+            "snapshot lama dipertahankan"
+        )
+        return
+
+    # Write-ahead: delta masuk outbox dulu. Kalau gagal di sini snapshot lama
+    # tetap dipakai, jadi run berikutnya menghitung ulang delta yang sama.
+    await enqueue_deltas(supplier, report.accepted)
+
+    # Histori harga, append-only per hari dan supplier
+    if archive is not None:
+        await asyncio.to_thread(
+            archive.append, supplier.name, report.accepted, fetched_at
+        )
+
     # Save ke file JSON
-    save_path = save_dir / f"{supplier.name.replace(' ', '_').lower()}.json"
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump([p.model_dump() for p in products], f, ensure_ascii=False, indent=2)
+    snapshot = accepted_snapshot(previous, products, report, current_ids, previous_ids)
+    data = json.dumps(
+        [p.model_dump() for p in snapshot], ensure_ascii=False, indent=2
+    ).encode()
+    if registry is not None:
+        # file id diikat ke digest snapshot, file yang tertinggal tidak akan dipakai
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            ids=accepted_snapshot_ids(
+                previous, products, report, current_ids, previous_ids
+            ),
+            digest=hashlib.sha1(data).hexdigest(),
+            aliases=_alias_key(supplier),
+        )
+        _write_atomic(ids_path, buf.getvalue())
+    _write_atomic(save_path, data)
+    if hold.jumps or hold_path.exists():
+        _write_atomic(hold_path, hold.model_dump_json().encode())
+    accept_path.unlink(missing_ok=True)
+    # ETag baru dipakai setelah snapshot tersimpan. Selama ada yang dikarantina
+    # body penuh tetap diunduh, supaya hitungan observasi hold terus berjalan.
+    if not report.quarantined:
+        commit_etag(str(supplier.url_harga))
 
     logger.success(f"[{supplier.name}] data berhasil disimpan ke {save_path}")
 
 
+async def fetch_all(
+    suppliers: list[Supplier],
+    save_dir: Path,
+    archive: PriceArchive,
+    registry: KodeRegistry,
+) -> None:
+    tasks = [fetch_and_save(s, save_dir, archive, registry) for s in suppliers]
+
+    # Parallel fetch, kalau ada error tetap jalan untuk supplier lain
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Log error kalau ada exception
+    for supplier, result in zip(suppliers, results):
+        if isinstance(result, Exception):
+            logger.error(f"[{supplier.name}] gagal fetch: {result}")
+
+    log_transfer_summary()
+
+
 async def main():
     suppliers = [
         sample_supplier_json(),
@@ -78,17 +264,87 @@ async def main():
 
     save_dir = Path("scraped_data")
     save_dir.mkdir(exist_ok=True)
+    await init_app_db()
+    archive = PriceArchive(Path("price_history"))
+    registry = KodeRegistry()
+    await registry.load()
 
-    tasks = [fetch_and_save(s, save_dir) for s in suppliers]
+    await fetch_all(suppliers, save_dir, archive, registry)
 
-    # Parallel fetch, kalau ada error tetap jalan untuk supplier lain
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Push delta ke otomax, sisa yang gagal dilanjutkan di run berikutnya
+    await OutboxPusher().drain()
+    await get_http_pool().aclose()
 
-    # Log error kalau ada exception
-    for supplier, result in zip(suppliers, results):
-        if isinstance(result, Exception):
-            logger.error(f"[{supplier.name}] gagal fetch: {result}")
+
+async def compact_archive(archive: PriceArchive) -> None:
+    """Gabungkan chunk arsip kemarin, jalan sekali sehari dari scheduler."""
+    day = date.today() - timedelta(days=1)
+    try:
+        await asyncio.to_thread(archive.compact_day, day)
+    except Exception as e:
+        logger.error(f"gagal compact arsip harga {day}: {e}")
+
+
+async def run_daemon():
+    """Fetch berkala dengan scheduler, settings di-reload tanpa restart."""
+    suppliers = [
+        sample_supplier_json(),
+        sample_supplier_html(),
+    ]
+
+    save_dir = Path("scraped_data")
+    save_dir.mkdir(exist_ok=True)
+    await init_app_db()
+    archive = PriceArchive(Path("price_history"))
+    registry = KodeRegistry()
+    await registry.load()
+
+    manager = get_settings_manager()
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(
+        fetch_all,
+        "interval",
+        seconds=manager.current.FETCH.interval,
+        args=[suppliers, save_dir, archive, registry],
+        id="fetch_all",
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now(),
+    )
+
+    # chunk kemarin sudah tidak bertambah, gabungkan setelah tengah malam
+    scheduler.add_job(
+        compact_archive,
+        "cron",
+        hour=0,
+        minute=15,
+        args=[archive],
+        id="compact_archive",
+        max_instances=1,
+        coalesce=True,
+    )
+
+    def on_fetch_change(event: SettingsChanged) -> None:
+        old: ConfigFetcher = event.old  # type: ignore[assignment]
+        new: ConfigFetcher = event.new  # type: ignore[assignment]
+        if old.interval != new.interval:
+            scheduler.reschedule_job("fetch_all", trigger="interval", seconds=new.interval)
+            logger.info(f"interval fetch diubah ke {new.interval}s")
+
+    manager.subscribe("FETCH", on_fetch_change)
+    scheduler.start()
+
+    stop = asyncio.Event()
+    try:
+        await asyncio.gather(
+            manager.watch(stop=stop),
+            OutboxPusher().run_forever(stop),
+        )
+    finally:
+        stop.set()
+        scheduler.shutdown(wait=False)
+        await get_http_pool().aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(run_daemon() if "--daemon" in sys.argv else main())
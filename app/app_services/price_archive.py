@@ -0,0 +1,347 @@
+"""arsip histori harga, append-only dan kolumnar.
+
+setiap kali ada delta, satu chunk baru ditulis ke partisi hari + supplier:
+
+    <root>/day=2025-09-01/<supplier>/000001.chunk
+    <root>/day=2025-09-01/<supplier>/index.json
+
+isi chunk (setelah header) dikompres zlib, per kolom:
+- kode   : dictionary-encoded (daftar kode unik + index uint32)
+- ts     : epoch detik, delta-encoded
+- harga  : delta-encoded, baris diurutkan per kode lalu ts supaya selisihnya kecil
+- status, kind : int8
+
+index.json menyimpan nama supplier asli, rentang waktu dan bloom filter kode per
+chunk, jadi query "harga kode X antara T1 dan T2" hanya membaca chunk yang relevan.
+
+chunk kecil dari hari sebelumnya digabung sekali sehari (`compact_day`, dijadwalkan
+di daemon). append dan compact untuk partisi yang sama saling menunggu, jadi aman
+dijalankan di thread (`asyncio.to_thread`).
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+
+from app.app_services.schemas import DeltaKind, ProductDelta
+
+_MAGIC = b"PHC1"
+_BLOOM_MIN_BITS = 1024
+_BLOOM_BITS_PER_KODE = 10
+_BLOOM_HASHES = 4
+_KINDS = list(DeltaKind)
+
+
+class PriceRecord(BaseModel):
+    ts: datetime
+    supplier: str
+    kode: str
+    harga: int
+    status: str
+    kind: DeltaKind
+
+
+def _slug(name: str) -> str:
+    return name.replace(" ", "_").lower()
+
+
+def _bloom_positions(kode: str, size: int) -> list[int]:
+    digest = hashlib.blake2b(kode.encode(), digest_size=4 * _BLOOM_HASHES).digest()
+    return [
+        int.from_bytes(digest[i * 4 : i * 4 + 4], "little") % size
+        for i in range(_BLOOM_HASHES)
+    ]
+
+
+def _bloom(kodes: list[str]) -> str:
+    # ukuran mengikuti jumlah kode supaya false positive tetap rendah
+    size = _BLOOM_MIN_BITS
+    while size < len(kodes) * _BLOOM_BITS_PER_KODE:
+        size *= 2
+    bits = np.zeros(size, dtype=bool)
+    for kode in kodes:
+        bits[_bloom_positions(kode, size)] = True
+    return np.packbits(bits).tobytes().hex()
+
+
+def _bloom_contains(bloom_hex: str, kode: str) -> bool:
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(bloom_hex), dtype=np.uint8))
+    return bool(bits[_bloom_positions(kode, len(bits))].all())
+
+
+def _delta_encode(values: np.ndarray) -> np.ndarray:
+    return np.diff(values, prepend=np.int64(0))
+
+
+def _delta_decode(values: np.ndarray) -> np.ndarray:
+    return np.cumsum(values, dtype=np.int64)
+
+
+def encode_chunk(
+    ts: np.ndarray,
+    kode: np.ndarray,
+    harga: np.ndarray,
+    status: np.ndarray,
+    kind: np.ndarray,
+) -> tuple[bytes, list[str]]:
+    """Encode kolom mentah ke bytes chunk. Return (bytes, daftar kode unik)."""
+    kode_dict, kode_idx = np.unique(kode, return_inverse=True)
+    order = np.lexsort((ts, kode_idx))
+    columns = {
+        "ts": _delta_encode(ts[order].astype(np.int64)),
+        "kode_idx": kode_idx[order].astype(np.uint32),
+        "harga": _delta_encode(harga[order].astype(np.int64)),
+        "status": status[order].astype(np.int8),
+        "kind": kind[order].astype(np.int8),
+    }
+    kode_list = kode_dict.tolist()
+    dict_bytes = "\n".join(kode_list).encode()
+    header = {
+        "rows": int(len(ts)),
+        "dict_nbytes": len(dict_bytes),
+        "columns": [
+            {"name": n, "dtype": c.dtype.str, "nbytes": c.nbytes}
+            for n, c in columns.items()
+        ],
+    }
+    body = dict_bytes + b"".join(c.tobytes() for c in columns.values())
+    header_bytes = json.dumps(header).encode()
+    return (
+        _MAGIC
+        + struct.pack("<I", len(header_bytes))
+        + header_bytes
+        + zlib.compress(body, 6),
+        kode_list,
+    )
+
+
+def decode_chunk(data: bytes) -> tuple[list[str], dict[str, np.ndarray]]:
+    """Kebalikan `encode_chunk`: return (kode dictionary, kolom yang sudah didekode)."""
+    if data[:4] != _MAGIC:
+        raise ValueError("Bukan file chunk histori harga.")
+    (header_len,) = struct.unpack("<I", data[4:8])
+    header = json.loads(data[8 : 8 + header_len])
+    body = zlib.decompress(data[8 + header_len :])
+
+    offset = header["dict_nbytes"]
+    dict_raw = body[:offset].decode()
+    kode_dict = dict_raw.split("\n") if dict_raw else []
+    columns: dict[str, np.ndarray] = {}
+    for col in header["columns"]:
+        columns[col["name"]] = np.frombuffer(
+            body, dtype=np.dtype(col["dtype"]), count=header["rows"], offset=offset
+        )
+        offset += col["nbytes"]
+    columns["ts"] = _delta_decode(columns["ts"])
+    columns["harga"] = _delta_decode(columns["harga"])
+    return kode_dict, columns
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PriceArchive:
+    def __init__(self, root: Path):
+        self.root = root
+        self._locks: dict[Path, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, part: Path) -> threading.Lock:
+        """Lock per partisi untuk update index.json."""
+        with self._locks_guard:
+            return self._locks.setdefault(part, threading.Lock())
+
+    def _partition(self, day: date, supplier: str) -> Path:
+        return self.root / f"day={day.isoformat()}" / _slug(supplier)
+
+    def _suppliers(self, day: date, supplier: str | None) -> list[Path]:
+        day_dir = self.root / f"day={day.isoformat()}"
+        if supplier is not None:
+            part = day_dir / _slug(supplier)
+            return [part] if part.is_dir() else []
+        if not day_dir.is_dir():
+            return []
+        return sorted(p for p in day_dir.iterdir() if p.is_dir())
+
+    @staticmethod
+    def _read_index(part: Path) -> list[dict]:
+        index_path = part / "index.json"
+        if not index_path.exists():
+            return []
+        with open(index_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_index(part: Path, index: list[dict]) -> None:
+        _write_atomic(part / "index.json", json.dumps(index).encode())
+
+    def _write_chunk(
+        self,
+        part: Path,
+        index: list[dict],
+        columns: dict[str, np.ndarray],
+        supplier: str,
+    ) -> dict:
+        data, kode_list = encode_chunk(**columns)
+        seq = max((int(c["file"].split(".")[0]) for c in index), default=0) + 1
+        name = f"{seq:06d}.chunk"
+        _write_atomic(part / name, data)
+        return {
+            "file": name,
+            "supplier": supplier,
+            "rows": int(len(columns["ts"])),
+            "ts_min": int(columns["ts"].min()),
+            "ts_max": int(columns["ts"].max()),
+            "bloom": _bloom(kode_list),
+        }
+
+    def append(
+        self,
+        supplier: str,
+        deltas: list[ProductDelta],
+        ts: datetime | None = None,
+    ) -> None:
+        """Tulis delta satu snapshot sebagai satu chunk baru."""
+        if not deltas:
+            return
+        ts = ts or datetime.now()
+        part = self._partition(ts.date(), supplier)
+        part.mkdir(parents=True, exist_ok=True)
+
+        n = len(deltas)
+        columns = {
+            "ts": np.full(n, int(ts.timestamp()), dtype=np.int64),
+            "kode": np.array([d.kode for d in deltas], dtype=np.str_),
+            "harga": np.fromiter((d.harga for d in deltas), dtype=np.int64, count=n),
+            "status": np.fromiter(
+                (1 if d.status == "1" else 0 for d in deltas), dtype=np.int8, count=n
+            ),
+            "kind": np.fromiter(
+                (_KINDS.index(d.kind) for d in deltas), dtype=np.int8, count=n
+            ),
+        }
+        with self._lock(part):
+            index = self._read_index(part)
+            index.append(self._write_chunk(part, index, columns, supplier))
+            self._write_index(part, index)
+        logger.debug(f"[{supplier}] {n} delta diarsipkan ke {part}")
+
+    def _scan(
+        self,
+        day: date,
+        supplier: str | None,
+        kode: str | None = None,
+        ts_from: int | None = None,
+        ts_to: int | None = None,
+    ) -> list[PriceRecord]:
+        records: list[PriceRecord] = []
+        for part in self._suppliers(day, supplier):
+            for chunk in self._read_index(part):
+                if ts_from is not None and chunk["ts_max"] < ts_from:
+                    continue
+                if ts_to is not None and chunk["ts_min"] > ts_to:
+                    continue
+                if kode is not None and not _bloom_contains(chunk["bloom"], kode):
+                    continue
+                kode_dict, cols = decode_chunk((part / chunk["file"]).read_bytes())
+                # index lama belum menyimpan nama supplier, pakai nama folder
+                supplier_name = chunk.get("supplier", part.name)
+
+                mask = np.ones(len(cols["ts"]), dtype=bool)
+                if kode is not None:
+                    pos = int(np.searchsorted(kode_dict, kode))
+                    if pos >= len(kode_dict) or kode_dict[pos] != kode:
+                        continue  # bloom false positive
+                    mask &= cols["kode_idx"] == pos
+                if ts_from is not None:
+                    mask &= cols["ts"] >= ts_from
+                if ts_to is not None:
+                    mask &= cols["ts"] <= ts_to
+
+                for t, k, h, s, kd in zip(
+                    cols["ts"][mask].tolist(),
+                    cols["kode_idx"][mask].tolist(),
+                    cols["harga"][mask].tolist(),
+                    cols["status"][mask].tolist(),
+                    cols["kind"][mask].tolist(),
+                ):
+                    records.append(
+                        PriceRecord.model_construct(
+                            ts=datetime.fromtimestamp(t),
+                            supplier=supplier_name,
+                            kode=kode_dict[k],
+                            harga=h,
+                            status=str(s),
+                            kind=_KINDS[kd],
+                        )
+                    )
+        return records
+
+    def price_of(
+        self,
+        kode: str,
+        start: datetime,
+        end: datetime,
+        supplier: str | None = None,
+    ) -> list[PriceRecord]:
+        """Histori harga satu kode dalam rentang waktu, urut berdasarkan waktu."""
+        records: list[PriceRecord] = []
+        ts_from, ts_to = int(start.timestamp()), int(end.timestamp())
+        day = start.date()
+        while day <= end.date():
+            records += self._scan(day, supplier, kode, ts_from, ts_to)
+            day += timedelta(days=1)
+        records.sort(key=lambda r: r.ts)
+        return records
+
+    def changes_on(self, day: date, supplier: str | None = None) -> list[PriceRecord]:
+        """Semua perubahan pada satu hari, urut berdasarkan waktu."""
+        records = self._scan(day, supplier)
+        records.sort(key=lambda r: r.ts)
+        return records
+
+    def compact(self, day: date, supplier: str) -> None:
+        """Gabungkan semua chunk satu partisi menjadi satu chunk."""
+        self._compact_partition(self._partition(day, supplier), day)
+
+    def compact_day(self, day: date) -> None:
+        """Gabungkan chunk semua supplier untuk satu hari."""
+        for part in self._suppliers(day, None):
+            self._compact_partition(part, day)
+
+    def _compact_partition(self, part: Path, day: date) -> None:
+        with self._lock(part):
+            index = self._read_index(part)
+            if len(index) < 2:
+                return
+            merged: dict[str, list[np.ndarray]] = {
+                name: [] for name in ("ts", "kode", "harga", "status", "kind")
+            }
+            for chunk in index:
+                kode_dict, cols = decode_chunk((part / chunk["file"]).read_bytes())
+                merged["kode"].append(
+                    np.array(kode_dict, dtype=np.str_)[cols["kode_idx"]]
+                )
+                for name in ("ts", "harga", "status", "kind"):
+                    merged[name].append(cols[name])
+            columns = {name: np.concatenate(parts) for name, parts in merged.items()}
+
+            supplier = index[-1].get("supplier", part.name)
+            new_chunk = self._write_chunk(part, index, columns, supplier)
+            self._write_index(part, [new_chunk])
+            for chunk in index:
+                (part / chunk["file"]).unlink(missing_ok=True)
+        logger.info(f"[{part.name}] {len(index)} chunk digabung untuk {day}")
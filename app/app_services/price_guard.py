@@ -0,0 +1,412 @@
+"""validasi snapshot harga sebelum dikirim ke otomax.
+
+parser mengubah nilai yang gagal dibaca menjadi harga 0, jadi halaman supplier yang
+rusak bisa mendorong harga 0 atau harga 100x ke otomax. semua cek di sini dijalankan
+sekaligus untuk seluruh snapshot (vectorized dengan numpy), bukan per item.
+
+cek per produk (delta dikarantina):
+- harga 0
+- lonjakan harga dibanding snapshot sebelumnya
+
+cek per snapshot (seluruh delta dikarantina):
+- snapshot baru kosong padahal snapshot lama ada isinya
+- banyak produk hilang sekaligus
+- banyak status berubah sekaligus
+
+yang ditahan tidak ditahan selamanya: kalau supplier memang mengubah harga, nilai
+yang sama akan terus terlihat. setelah `rebaseline_after` observasi berturut-turut
+yang identik, lonjakan harga dan snapshot yang ditahan diterima jadi baseline baru
+(lihat `GuardHold`). harga 0 dan snapshot kosong tidak pernah dilepas otomatis,
+hanya lewat `accept_all` oleh operator.
+"""
+
+import hashlib
+import time
+from enum import StrEnum
+from itertools import count
+from operator import attrgetter
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter
+
+from app.app_services.schemas import DeltaKind, ProductDelta, ProductInDB
+from app.config.values import ConfigPriceGuard
+
+
+class GuardFlag(StrEnum):
+    ZERO_PRICE = "zero_price"
+    PRICE_JUMP = "price_jump"
+    EMPTY_SNAPSHOT = "empty_snapshot"
+    MASS_DISAPPEAR = "mass_disappear"
+    MASS_STATUS_FLIP = "mass_status_flip"
+
+
+class QuarantinedDelta(BaseModel):
+    delta: ProductDelta
+    flags: list[GuardFlag]
+
+
+class GuardReport(BaseModel):
+    accepted: list[ProductDelta] = []
+    quarantined: list[QuarantinedDelta] = []
+    snapshot_flags: list[GuardFlag] = []
+
+    @property
+    def blocked(self) -> bool:
+        """True kalau seluruh snapshot ditahan."""
+        return bool(self.snapshot_flags)
+
+
+class HeldJump(BaseModel):
+    harga: int
+    status: str
+    seen: int = 1
+
+
+class GuardHold(BaseModel):
+    """Hitungan observasi berturut-turut untuk yang sedang ditahan, per supplier."""
+
+    snapshot_digest: str = ""
+    snapshot_seen: int = 0
+    jumps: dict[str, HeldJump] = {}
+
+
+# flag yang tidak pernah dilepas otomatis, hampir pasti halaman supplier rusak
+_NEVER_AUTO_RELEASE = frozenset({GuardFlag.ZERO_PRICE, GuardFlag.EMPTY_SNAPSHOT})
+
+_ZERO = np.uint8(1)
+_JUMP = np.uint8(2)
+_ROW_FLAGS = ((_ZERO, GuardFlag.ZERO_PRICE), (_JUMP, GuardFlag.PRICE_JUMP))
+_DELTA_LIST = TypeAdapter(list[ProductDelta])
+
+
+def _factorize(
+    previous: list[str], current: list[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Ubah string kedua snapshot ke id int, nilai yang sama mendapat id yang sama.
+
+    id adalah index kemunculan pertama di snapshot lama, nilai yang hanya ada di
+    snapshot baru diberi id mulai dari `len(previous)`.
+    """
+    ids = dict(zip(reversed(previous), range(len(previous) - 1, -1, -1)))
+    prev_ids = np.fromiter(
+        map(ids.__getitem__, previous), dtype=np.int64, count=len(previous)
+    )
+    cur_ids = np.fromiter(
+        map(ids.setdefault, current, count(len(previous))),
+        dtype=np.int64,
+        count=len(current),
+    )
+    return prev_ids, cur_ids
+
+
+def _columns(
+    products: list[ProductInDB], kode: np.ndarray, status: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Kolom numpy int untuk satu snapshot, kode duplikat diambil yang pertama."""
+    harga = np.fromiter(
+        map(attrgetter("harga"), products), dtype=np.int64, count=len(products)
+    )
+    _, first = np.unique(kode, return_index=True)
+    keep = np.sort(first)
+    return kode[keep], harga[keep], status[keep], keep
+
+
+def _row_flags(bits: int) -> list[GuardFlag]:
+    return [flag for bit, flag in _ROW_FLAGS if bits & bit]
+
+
+def _delta_rows(
+    current: list[ProductInDB],
+    previous: list[ProductInDB],
+    new_rows: np.ndarray,
+    changed_rows: np.ndarray,
+    changed_prev_rows: np.ndarray,
+    removed_rows: np.ndarray,
+) -> list[dict]:
+    """Data delta untuk baris yang berubah saja, urutannya new, changed, removed."""
+    rows = []
+    for p in map(current.__getitem__, new_rows.tolist()):
+        rows.append(
+            {
+                "kode": p.kode,
+                "deskripsi": p.deskripsi,
+                "harga": p.harga,
+                "status": p.status,
+                "kind": DeltaKind.NEW,
+            }
+        )
+    for p, old in zip(
+        map(current.__getitem__, changed_rows.tolist()),
+        map(previous.__getitem__, changed_prev_rows.tolist()),
+    ):
+        rows.append(
+            {
+                "kode": p.kode,
+                "deskripsi": p.deskripsi,
+                "harga": p.harga,
+                "status": p.status,
+                "kind": DeltaKind.CHANGED,
+                "harga_lama": old.harga,
+                "status_lama": old.status,
+            }
+        )
+    for p in map(previous.__getitem__, removed_rows.tolist()):
+        rows.append(
+            {
+                "kode": p.kode,
+                "deskripsi": p.deskripsi,
+                "harga": p.harga,
+                "status": "0",
+                "kind": DeltaKind.REMOVED,
+                "harga_lama": p.harga,
+                "status_lama": p.status,
+            }
+        )
+    return rows
+
+
+def check_snapshot(
+    previous: list[ProductInDB],
+    current: list[ProductInDB],
+    config: ConfigPriceGuard | None = None,
+    current_ids: np.ndarray | None = None,
+    previous_ids: np.ndarray | None = None,
+) -> GuardReport:
+    """Bandingkan snapshot baru dengan snapshot lama dan pisahkan delta yang mencurigakan."""
+    cfg = config or ConfigPriceGuard()
+    started = time.perf_counter()
+    if (current_ids is None) != (previous_ids is None):
+        raise ValueError("current_ids dan previous_ids harus diberikan bersamaan.")
+
+    # kode dan status dibandingkan sebagai id int, bukan string. kalau id dari
+    # `KodeRegistry` diberikan, id itu yang dipakai untuk kode.
+    if current_ids is None:
+        previous_ids, current_ids = _factorize(
+            list(map(attrgetter("kode"), previous)),
+            list(map(attrgetter("kode"), current)),
+        )
+    prev_status_ids, cur_status_ids = _factorize(
+        list(map(attrgetter("status"), previous)),
+        list(map(attrgetter("status"), current)),
+    )
+    prev_kode, prev_harga, prev_status, prev_keep = _columns(
+        previous, np.asarray(previous_ids, dtype=np.int64), prev_status_ids
+    )
+    cur_kode, cur_harga, cur_status, cur_keep = _columns(
+        current, np.asarray(current_ids, dtype=np.int64), cur_status_ids
+    )
+
+    _, ci, pi = np.intersect1d(
+        cur_kode, prev_kode, assume_unique=True, return_indices=True
+    )
+    new_mask = np.ones(len(cur_kode), dtype=bool)
+    new_mask[ci] = False
+    removed_mask = np.ones(len(prev_kode), dtype=bool)
+    removed_mask[pi] = False
+
+    # flag per baris snapshot baru
+    flags = np.zeros(len(cur_kode), dtype=np.uint8)
+    flags[cur_harga <= 0] |= _ZERO
+    old_h = prev_harga[pi]
+    new_h = cur_harga[ci]
+    pct = np.abs(new_h - old_h) * 100.0 / np.where(old_h > 0, old_h, 1)
+    flags[ci[(old_h > 0) & (pct > cfg.max_jump_pct)]] |= _JUMP
+
+    status_flip = cur_status[ci] != prev_status[pi]
+    changed = (new_h != old_h) | status_flip
+
+    snapshot_flags: list[GuardFlag] = []
+    # snapshot kosong hampir pasti halaman supplier rusak, berapa pun ukuran snapshot lama
+    if len(prev_kode) and not len(cur_kode):
+        snapshot_flags.append(GuardFlag.EMPTY_SNAPSHOT)
+    # cek massal, hanya kalau snapshot lama cukup besar
+    if len(prev_kode) >= cfg.min_rows:
+        if removed_mask.sum() / len(prev_kode) > cfg.max_disappear_ratio:
+            snapshot_flags.append(GuardFlag.MASS_DISAPPEAR)
+        if len(ci) and status_flip.sum() / len(ci) > cfg.max_status_flip_ratio:
+            snapshot_flags.append(GuardFlag.MASS_STATUS_FLIP)
+
+    report = GuardReport(snapshot_flags=snapshot_flags)
+
+    # hanya baris yang berubah yang dijadikan object, divalidasi sekaligus
+    new_idx = np.flatnonzero(new_mask)
+    c_idx, p_idx = ci[changed], pi[changed]
+    removed_idx = np.flatnonzero(removed_mask)
+    deltas = _DELTA_LIST.validate_python(
+        _delta_rows(
+            current,
+            previous,
+            cur_keep[new_idx],
+            cur_keep[c_idx],
+            prev_keep[p_idx],
+            prev_keep[removed_idx],
+        )
+    )
+    delta_flags = np.concatenate(
+        (flags[new_idx], flags[c_idx], np.zeros(len(removed_idx), dtype=np.uint8))
+    )
+    if not snapshot_flags and not delta_flags.any():
+        report.accepted = deltas
+    else:
+        for delta, bits in zip(deltas, delta_flags.tolist()):
+            if snapshot_flags or bits:
+                report.quarantined.append(
+                    QuarantinedDelta.model_construct(
+                        delta=delta, flags=_row_flags(bits) + snapshot_flags
+                    )
+                )
+            else:
+                report.accepted.append(delta)
+
+    logger.debug(
+        f"price guard: {len(cur_kode)} baris, {len(report.accepted)} diterima, "
+        f"{len(report.quarantined)} dikarantina, flags={snapshot_flags} "
+        f"({(time.perf_counter() - started) * 1000:.1f} ms)"
+    )
+    return report
+
+
+def _accepted_rows(
+    previous: list[ProductInDB],
+    current: list[ProductInDB],
+    report: GuardReport,
+    current_ids: np.ndarray | None = None,
+    previous_ids: np.ndarray | None = None,
+) -> tuple[list[int], list[int]]:
+    """Index baris current dan previous yang masuk snapshot tersimpan.
+
+    Produk dicocokkan dengan id `KodeRegistry` kalau ada, jadi kode yang beda
+    penulisan ("a" vs "A") tetap dianggap produk yang sama.
+    """
+    if report.blocked:
+        return [], list(range(len(previous)))
+    if not report.quarantined:
+        return list(range(len(current))), []
+    if current_ids is None:
+        cur_keys: list = [p.kode for p in current]
+        prev_keys: list = [p.kode for p in previous]
+    else:
+        cur_keys = np.asarray(current_ids).tolist()
+        prev_keys = np.asarray(previous_ids).tolist()
+    # delta yang dikarantina selalu berasal dari baris current
+    key_of = dict(zip((p.kode for p in current), cur_keys))
+    held = {key_of[q.delta.kode] for q in report.quarantined if q.delta.kode in key_of}
+    cur_rows = [i for i, k in enumerate(cur_keys) if k not in held]
+    prev_first: dict = {}
+    for i, k in enumerate(prev_keys):
+        if k in held:
+            prev_first.setdefault(k, i)
+    return cur_rows, sorted(prev_first.values())
+
+
+def accepted_snapshot(
+    previous: list[ProductInDB],
+    current: list[ProductInDB],
+    report: GuardReport,
+    current_ids: np.ndarray | None = None,
+    previous_ids: np.ndarray | None = None,
+) -> list[ProductInDB]:
+    """Snapshot yang boleh disimpan: produk yang dikarantina tetap pakai nilai lama."""
+    cur_rows, prev_rows = _accepted_rows(
+        previous, current, report, current_ids, previous_ids
+    )
+    return [current[i] for i in cur_rows] + [previous[i] for i in prev_rows]
+
+
+def accepted_snapshot_ids(
+    previous: list[ProductInDB],
+    current: list[ProductInDB],
+    report: GuardReport,
+    current_ids: np.ndarray,
+    previous_ids: np.ndarray,
+) -> np.ndarray:
+    """Id kode untuk `accepted_snapshot` dengan urutan baris yang sama."""
+    cur_rows, prev_rows = _accepted_rows(
+        previous, current, report, current_ids, previous_ids
+    )
+    return np.concatenate(
+        (np.asarray(current_ids)[cur_rows], np.asarray(previous_ids)[prev_rows])
+    ).astype(np.int32)
+
+
+def snapshot_digest(products: list[ProductInDB]) -> str:
+    """Digest kode, harga, dan status, untuk mengenali snapshot yang sama."""
+    h = hashlib.sha1()
+    for p in products:
+        h.update(f"{p.kode}\t{p.harga}\t{p.status}\n".encode())
+    return h.hexdigest()
+
+
+def _release(report: GuardReport, drop: set[GuardFlag], keys: set[str]) -> GuardReport:
+    """Report baru dengan flag `drop` dilepas, untuk kode `keys` semua flag dilepas."""
+    released = GuardReport(
+        accepted=list(report.accepted),
+        snapshot_flags=[f for f in report.snapshot_flags if f not in drop],
+    )
+    for q in report.quarantined:
+        flags = [] if q.delta.kode in keys else [f for f in q.flags if f not in drop]
+        if flags:
+            released.quarantined.append(
+                QuarantinedDelta.model_construct(delta=q.delta, flags=flags)
+            )
+        else:
+            released.accepted.append(q.delta)
+    return released
+
+
+def accept_all(report: GuardReport) -> GuardReport:
+    """Terima seluruh snapshot apa adanya, untuk persetujuan operator."""
+    return _release(report, set(GuardFlag), set())
+
+
+def apply_hold(
+    report: GuardReport,
+    hold: GuardHold,
+    current: list[ProductInDB],
+    rebaseline_after: int,
+) -> tuple[GuardReport, GuardHold]:
+    """Lepas yang sudah terlihat identik `rebaseline_after` kali berturut-turut.
+
+    Mengembalikan report yang sudah dilepas sebagian dan hitungan hold yang baru.
+    """
+    new_hold = GuardHold()
+    if report.blocked:
+        auto = not _NEVER_AUTO_RELEASE.intersection(report.snapshot_flags)
+        digest = snapshot_digest(current) if auto else ""
+        if auto and digest == hold.snapshot_digest:
+            new_hold.snapshot_seen = hold.snapshot_seen + 1
+        elif auto:
+            new_hold.snapshot_seen = 1
+        new_hold.snapshot_digest = digest
+        if not auto or new_hold.snapshot_seen < rebaseline_after:
+            # lonjakan per produk tidak dihitung selama snapshot ditahan
+            new_hold.jumps = hold.jumps
+            return report, new_hold
+        logger.warning(
+            f"snapshot ditahan {new_hold.snapshot_seen}x berturut-turut dengan isi "
+            f"sama ({', '.join(report.snapshot_flags)}), dipakai jadi baseline baru"
+        )
+        new_hold = GuardHold()
+        report = _release(report, set(report.snapshot_flags), set())
+
+    released: set[str] = set()
+    for q in report.quarantined:
+        if q.flags != [GuardFlag.PRICE_JUMP]:
+            continue
+        d = q.delta
+        old = hold.jumps.get(d.kode)
+        same = old is not None and (old.harga, old.status) == (d.harga, d.status)
+        seen = old.seen + 1 if same else 1
+        if seen >= rebaseline_after:
+            released.add(d.kode)
+        else:
+            new_hold.jumps[d.kode] = HeldJump(harga=d.harga, status=d.status, seen=seen)
+    if released:
+        logger.warning(
+            f"{len(released)} lonjakan harga terlihat {rebaseline_after}x "
+            "berturut-turut, diterima jadi harga baru"
+        )
+        report = _release(report, set(), released)
+    return report, new_hold
@@ -4,6 +4,9 @@ from enum import StrEnum
 
 from pydantic import BaseModel, ValidationError, field_validator
 
+# key mapping dengan prefix ini adalah alias kode: {"kode:KODE SUPPLIER": "KODE_BAKU"}
+KODE_ALIAS_PREFIX = "kode:"
+
 
 class ProductInDB(BaseModel):
     kode: str
@@ -14,6 +17,24 @@ class ProductInDB(BaseModel):
     # updated_at: datetime just trust in database
 
 
+class DeltaKind(StrEnum):
+    NEW = "new"
+    CHANGED = "changed"
+    REMOVED = "removed"
+
+
+class ProductDelta(BaseModel):
+    """Perubahan satu produk dibanding snapshot sebelumnya."""
+
+    kode: str
+    deskripsi: str
+    harga: int
+    status: str
+    kind: DeltaKind
+    harga_lama: int | None = None
+    status_lama: str | None = None
+
+
 class WebResponseType(StrEnum):
     JSON = "json"
     HTML = "html"
@@ -40,10 +61,20 @@ class Supplier(BaseModel):
         allowed_keys = set(ProductInDB.model_fields.keys())
         if v is not None:
             for k in v.keys():
-                if k not in allowed_keys:
+                if k not in allowed_keys and not k.startswith(KODE_ALIAS_PREFIX):
                     raise ValidationError(f"Invalid mapping key: {k}")
         return v
 
+    def kode_aliases(self) -> dict[str, str]:
+        """Alias kode dari mapping, tanpa prefix `kode:`."""
+        if not self.mapping:
+            return {}
+        return {
+            k.removeprefix(KODE_ALIAS_PREFIX): v
+            for k, v in self.mapping.items()
+            if k.startswith(KODE_ALIAS_PREFIX)
+        }
+
     def normalize_status(self, raw_status: str) -> str:
         """
         Normalisasi status produk supplier ke '1' (aktif) atau '0' (nonaktif) sesuai status_mapping.
@@ -0,0 +1,221 @@
+"""negosiasi kompresi dan decode streaming untuk download supplier.
+
+body dibaca mentah dari socket (`aiter_raw`), didekompres per chunk, dan langsung
+diteruskan ke parser tanpa menunggu seluruh body selesai. byte yang lewat jaringan
+(wire) dan byte hasil decode dicatat per supplier supaya kelihatan supplier mana
+yang belum mengirim response terkompresi.
+
+brotli dan zstd opsional, hanya ditawarkan ke server kalau library-nya terpasang.
+
+kalau server mengirim `ETag`, request berikutnya ke url yang sama mengirim
+`If-None-Match` dan response 304 dilaporkan sebagai `NotModified`. ETag baru
+dipakai setelah pemanggil selesai menyimpan hasilnya (`commit_etag`), supaya
+fetch yang gagal di tengah jalan tidak membuat perubahan harga terlewat.
+"""
+
+import zlib
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+from loguru import logger
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def _supported_encodings() -> list[str]:
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings += ["gzip", "deflate"]
+    return encodings
+
+
+ACCEPT_ENCODING = ", ".join(_supported_encodings())
+
+
+class _Decoder:
+    """Dekompresi incremental untuk satu content-encoding.
+
+    `decompress` hanya dipanggil dengan data yang tidak kosong, decompressobj zstd
+    menolak dipakai lagi setelah frame selesai.
+    """
+
+    def __init__(self, encoding: str):
+        self._raw_fallback = False
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            # wbits +32: deteksi otomatis header gzip atau zlib
+            obj = zlib.decompressobj(zlib.MAX_WBITS | 32)
+            self._decompress = obj.decompress
+            self._flush = obj.flush
+            # sebagian server mengirim deflate mentah tanpa header zlib
+            self._raw_fallback = encoding == "deflate"
+        elif encoding == "br" and brotli is not None:
+            obj = brotli.Decompressor()
+            self._decompress = obj.process
+            self._flush = lambda: b""
+        elif encoding == "zstd" and zstandard is not None:
+            obj = zstandard.ZstdDecompressor().decompressobj(read_across_frames=True)
+            self._decompress = obj.decompress
+            self._flush = obj.flush
+        else:
+            raise ValueError(f"Content-Encoding {encoding} belum didukung.")
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b""
+        if not self._raw_fallback:
+            return self._decompress(data)
+        # header zlib hanya ada di awal body, fallback cukup dicek sekali
+        self._raw_fallback = False
+        try:
+            return self._decompress(data)
+        except zlib.error:
+            obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            self._decompress = obj.decompress
+            self._flush = obj.flush
+            return self._decompress(data)
+
+    def flush(self) -> bytes:
+        return self._flush()
+
+
+class NotModified(Exception):
+    """Server menjawab 304, isi tidak berubah sejak ETag terakhir."""
+
+
+class TransferStats(BaseModel):
+    requests: int = 0
+    not_modified: int = 0
+    wire_bytes: int = 0
+    decoded_bytes: int = 0
+    last_encoding: str = "identity"
+
+    @property
+    def ratio(self) -> float:
+        """Perbandingan wire/decoded, 1.0 berarti tidak terkompresi."""
+        if not self.decoded_bytes:
+            return 1.0
+        return self.wire_bytes / self.decoded_bytes
+
+
+_transfer_stats: dict[str, TransferStats] = {}
+# ETag per url: yang sudah disimpan pemanggil dan yang baru selesai didownload
+_etags: dict[str, str] = {}
+_pending_etags: dict[str, str] = {}
+
+
+def get_transfer_stats() -> dict[str, TransferStats]:
+    return _transfer_stats
+
+
+def commit_etag(url: str) -> None:
+    """Pakai ETag download terakhir untuk request berikutnya ke url ini."""
+    etag = _pending_etags.pop(url, None)
+    if etag is not None:
+        _etags[url] = etag
+
+
+def clear_etags() -> None:
+    _etags.clear()
+    _pending_etags.clear()
+
+
+def log_transfer_summary() -> None:
+    """Log ringkasan byte per supplier, yang paling boros di atas."""
+    for name, stats in sorted(
+        _transfer_stats.items(), key=lambda kv: kv[1].wire_bytes, reverse=True
+    ):
+        logger.info(
+            f"[{name}] {stats.requests} request, wire {stats.wire_bytes} B, "
+            f"decoded {stats.decoded_bytes} B, ratio {stats.ratio:.2f} "
+            f"({stats.last_encoding}), {stats.not_modified} not modified"
+        )
+
+
+class DecodedStream:
+    """Body response yang didekompres per chunk sambil menghitung byte."""
+
+    def __init__(self, resp: httpx.Response, supplier_name: str, url: str):
+        self._resp = resp
+        self._supplier_name = supplier_name
+        self._url = url
+        raw = resp.headers.get("content-encoding", "identity").lower()
+        self.encodings = [
+            e.strip() for e in raw.split(",") if e.strip() not in ("", "identity")
+        ]
+
+    @property
+    def charset(self) -> str:
+        return self._resp.charset_encoding or "utf-8"
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        # encoding yang diterapkan terakhir harus didekode pertama
+        decoders = [_Decoder(e) for e in reversed(self.encodings)]
+        stats = _transfer_stats.setdefault(self._supplier_name, TransferStats())
+        stats.requests += 1
+        stats.last_encoding = ", ".join(self.encodings) or "identity"
+        wire = decoded = 0
+
+        async for chunk in self._resp.aiter_raw():
+            wire += len(chunk)
+            for decoder in decoders:
+                chunk = decoder.decompress(chunk)
+                if not chunk:
+                    break
+            if chunk:
+                decoded += len(chunk)
+                yield chunk
+
+        # sisa buffer decoder
+        tail = b""
+        for decoder in decoders:
+            tail = decoder.decompress(tail) + decoder.flush()
+        if tail:
+            decoded += len(tail)
+            yield tail
+
+        stats.wire_bytes += wire
+        stats.decoded_bytes += decoded
+        etag = self._resp.headers.get("etag")
+        if etag:
+            _pending_etags[self._url] = etag
+        else:
+            _pending_etags.pop(self._url, None)
+        logger.debug(
+            f"[{self._supplier_name}] wire {wire} B, decoded {decoded} B "
+            f"({stats.last_encoding})"
+        )
+
+
+@asynccontextmanager
+async def open_stream(
+    client: httpx.AsyncClient, url: str, supplier_name: str
+) -> AsyncIterator[DecodedStream]:
+    """GET dengan negosiasi kompresi dan ETag.
+
+    Raise `NotModified` kalau server menjawab 304, raise kalau status bukan 2xx.
+    """
+    headers = {"Accept-Encoding": ACCEPT_ENCODING}
+    etag = _etags.get(url)
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    async with client.stream("GET", url, headers=headers) as resp:
+        if resp.status_code == httpx.codes.NOT_MODIFIED:
+            stats = _transfer_stats.setdefault(supplier_name, TransferStats())
+            stats.requests += 1
+            stats.not_modified += 1
+            raise NotModified(url)
+        resp.raise_for_status()
+        yield DecodedStream(resp, supplier_name, url)
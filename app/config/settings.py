@@ -1,14 +1,20 @@
+import asyncio
+import inspect
 import os
-from functools import lru_cache
+from collections.abc import Awaitable, Callable
 from pathlib import Path
 
 from loguru import logger
+from pydantic import BaseModel, Field, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from app.config.values import (
     ConfigAdminAccount,
     ConfigAppDatabase,
     ConfigEnvironment,
+    ConfigFetcher,
+    ConfigOtomaxDB,
+    ConfigPriceGuard,
 )
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -23,19 +29,124 @@ class Settings(BaseSettings):
         extra="ignore",
         case_sensitive=False,
     )
-    ENV: ConfigEnvironment = ConfigEnvironment()
-    DB: ConfigAppDatabase = ConfigAppDatabase()
-    ADM: ConfigAdminAccount = ConfigAdminAccount()
+    ENV: ConfigEnvironment = Field(default_factory=ConfigEnvironment)
+    DB: ConfigAppDatabase = Field(default_factory=ConfigAppDatabase)
+    OTO: ConfigOtomaxDB = Field(default_factory=ConfigOtomaxDB)
+    ADM: ConfigAdminAccount = Field(default_factory=ConfigAdminAccount)
+    FETCH: ConfigFetcher = Field(default_factory=ConfigFetcher)
+    GUARD: ConfigPriceGuard = Field(default_factory=ConfigPriceGuard)
 
 
-@lru_cache
-def get_settings(_env_file: str | Path | None = None) -> Settings:
+class SettingsChanged(BaseModel):
+    """Event perubahan satu section settings (mis. `DB`, `FETCH`)."""
+
+    section: str
+    old: BaseSettings
+    new: BaseSettings
+
+
+SettingsListener = Callable[[SettingsChanged], Awaitable[None] | None]
+
+
+class SettingsManager:
+    """Pemegang settings aktif, reload dari env file tanpa restart aplikasi.
+
+    Komponen subscribe ke section yang relevan dan menerima `SettingsChanged`
+    setiap kali nilai section itu berubah.
+    """
+
+    def __init__(self, env_file: Path):
+        self.env_file = env_file
+        self._current = self._load()
+        self._mtime = self._read_mtime()
+        self._listeners: dict[str, list[SettingsListener]] = {}
+
+    @property
+    def current(self) -> Settings:
+        return self._current
+
+    def _load(self) -> Settings:
+        logger.trace(f"Loading settings from {self.env_file}")
+        return Settings(_env_file=self.env_file, _env_file_encoding="utf-8")  # type: ignore
+
+    def _read_mtime(self) -> float | None:
+        try:
+            return self.env_file.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def subscribe(self, section: str, listener: SettingsListener) -> None:
+        self._listeners.setdefault(section, []).append(listener)
+
+    async def reload(self) -> list[SettingsChanged]:
+        """Baca ulang env file dan kirim event untuk section yang berubah."""
+        try:
+            new = await asyncio.to_thread(self._load)
+        except ValidationError as e:
+            logger.error(f"Settings baru tidak valid, tetap pakai yang lama: {e}")
+            return []
+        except Exception as e:
+            # file setengah tertulis, encoding rusak, permission, dll.
+            logger.error(
+                f"Gagal membaca {self.env_file}, tetap pakai settings lama: "
+                f"{type(e).__name__}: {e}"
+            )
+            return []
+
+        old, self._current = self._current, new
+        events = [
+            SettingsChanged(section=name, old=getattr(old, name), new=getattr(new, name))
+            for name in Settings.model_fields
+            if getattr(old, name) != getattr(new, name)
+        ]
+        for event in events:
+            logger.info(f"Settings {event.section} berubah")
+            for listener in self._listeners.get(event.section, []):
+                try:
+                    result = listener(event)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Gagal menerapkan settings {event.section}: {e}")
+        return events
+
+    async def watch(
+        self, interval: float = 2.0, stop: asyncio.Event | None = None
+    ) -> None:
+        """Pantau mtime env file dan reload kalau berubah."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except TimeoutError:
+                pass
+            try:
+                mtime = self._read_mtime()
+                if mtime != self._mtime:
+                    self._mtime = mtime
+                    await self.reload()
+            except Exception as e:
+                # watcher tidak boleh mati, daemon ikut berhenti kalau ini raise
+                logger.error(f"Gagal memantau {self.env_file}: {e}")
+
+
+_managers: dict[Path, SettingsManager] = {}
+
+
+def get_settings_manager(_env_file: str | Path | None = None) -> SettingsManager:
     """Prioritas:.
 
     1. Argumen _env_file
     2. ENV_FILE dari environment variable
     3. DEFAULT_ENV_FILE (.env)
     """
-    env_file = _env_file or os.getenv("ENV_FILE", DEFAULT_ENV_FILE)
-    logger.trace(f"Loading settings from {env_file}")
-    return Settings(_env_file=env_file, _env_file_encoding="utf-8")  # type: ignore
+    env_file = Path(_env_file or os.getenv("ENV_FILE", DEFAULT_ENV_FILE))
+    manager = _managers.get(env_file)
+    if manager is None:
+        manager = _managers[env_file] = SettingsManager(env_file)
+    return manager
+
+
+def get_settings(_env_file: str | Path | None = None) -> Settings:
+    """Settings aktif, selalu nilai terbaru setelah hot reload."""
+    return get_settings_manager(_env_file).current
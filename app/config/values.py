@@ -38,35 +38,91 @@ class ConfigAppDatabase(BaseSettings):
     )
 
     timeout: int = Field(
-        default=5, description="Waktu tunggu (detik) untuk koneksi database."
+        default=5, ge=1, description="Waktu tunggu (detik) untuk koneksi database."
     )
 
     pool_size: int = Field(
-        default=5, description="Jumlah koneksi yang disimpan dalam pool."
+        default=5, ge=1, description="Jumlah koneksi yang disimpan dalam pool."
     )
     max_overflow: int = Field(
         default=10,
+        ge=0,
         description="Jumlah koneksi tambahan yang diizinkan saat pool penuh.",
     )
 
 
 class ConfigOtomaxDB(BaseSettings):
-    url: str = "mssql+pyodbc://localhost/otomax_db?driver=ODBC+Driver+17+for+SQL+Server"
+    url: str = "mssql+aioodbc://localhost/otomax_db?driver=ODBC+Driver+17+for+SQL+Server"
     echo: bool = Field(
         default=False, description="Enable SQL logging. Disable for production."
     )
     timeout: int = Field(
-        default=5, description="Timeout (seconds) for database connection."
+        default=5, ge=1, description="Timeout (seconds) for database connection."
     )
     pool_size: int = Field(
-        default=5, description="Number of connections to keep in the pool."
+        default=5, ge=1, description="Number of connections to keep in the pool."
     )
     max_overflow: int = Field(
         default=10,
+        ge=0,
         description="Number of additional connections allowed beyond the pool size.",
     )
 
 
+class ConfigFetcher(BaseSettings):
+    """Konfigurasi fetch harga supplier."""
+
+    timeout: float = Field(
+        default=15, gt=0, description="Waktu tunggu (detik) untuk request ke supplier."
+    )
+    max_connections: int = Field(
+        default=100, ge=1, description="Jumlah koneksi HTTP maksimum dalam pool."
+    )
+    max_keepalive: int = Field(
+        default=20, ge=0, description="Jumlah koneksi HTTP idle yang dipertahankan."
+    )
+    concurrency: int = Field(
+        default=20, ge=1, description="Jumlah supplier yang di-fetch bersamaan."
+    )
+    interval: int = Field(
+        default=300,
+        ge=1,
+        description="Jeda (detik) antar siklus fetch semua supplier.",
+    )
+
+
+class ConfigPriceGuard(BaseSettings):
+    """Ambang batas validasi snapshot harga sebelum dikirim ke otomax."""
+
+    max_jump_pct: float = Field(
+        default=50.0,
+        gt=0,
+        description="Persentase perubahan harga maksimum sebelum dikarantina.",
+    )
+    max_disappear_ratio: float = Field(
+        default=0.3,
+        ge=0,
+        le=1,
+        description="Rasio produk hilang maksimum sebelum seluruh snapshot ditahan.",
+    )
+    max_status_flip_ratio: float = Field(
+        default=0.5,
+        ge=0,
+        le=1,
+        description="Rasio perubahan status maksimum sebelum seluruh snapshot ditahan.",
+    )
+    min_rows: int = Field(
+        default=20,
+        ge=0,
+        description="Jumlah produk minimum snapshot lama agar cek massal berlaku.",
+    )
+    rebaseline_after: int = Field(
+        default=3,
+        ge=1,
+        description="Observasi identik berturut-turut sebelum yang ditahan dilepas.",
+    )
+
+
 class ConfigAdminAccount(BaseSettings):
     username: str = "admin"
     full_name: str = "Administrator"
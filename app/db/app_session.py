@@ -0,0 +1,57 @@
+"""session untuk database aplikasi (sqlite dengan aiosqlite).
+
+engine dibuat ulang kalau section `DB` di settings berubah, session baru
+langsung memakai engine baru dan engine lama di-dispose.
+"""
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase
+
+from app.config.settings import SettingsChanged, get_settings_manager
+from app.config.values import ConfigAppDatabase
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+def _build_engine(cfg: ConfigAppDatabase) -> AsyncEngine:
+    return create_async_engine(
+        url=cfg.url,
+        echo=cfg.echo,
+        pool_size=cfg.pool_size,
+        max_overflow=cfg.max_overflow,
+        connect_args={"timeout": cfg.timeout},
+    )
+
+
+_settings_manager = get_settings_manager()
+app_engine = _build_engine(_settings_manager.current.DB)
+AppAsyncSessionLocal = async_sessionmaker(
+    bind=app_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+
+async def _on_db_change(event: SettingsChanged) -> None:
+    global app_engine
+    old, app_engine = app_engine, _build_engine(event.new)  # type: ignore[arg-type]
+    AppAsyncSessionLocal.configure(bind=app_engine)
+    await old.dispose()
+    logger.info("engine database aplikasi dibuat ulang")
+
+
+_settings_manager.subscribe("DB", _on_db_change)
+
+
+async def init_app_db() -> None:
+    """Buat tabel yang belum ada di database aplikasi."""
+    async with app_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,155 @@
+"""tabel kode produk global, dipakai bersama semua supplier.
+
+kode dari supplier dinormalisasi (spasi dibuang, huruf besar, lalu alias dari
+`Supplier.mapping`) dan dipetakan ke id integer yang disimpan di database
+aplikasi. snapshot dan diff cukup membandingkan array int, bukan string.
+
+kode mentah yang sudah pernah dilihat di-cache per supplier, jadi fetch berikutnya
+cukup satu lookup dict per baris tanpa normalisasi ulang.
+"""
+
+import asyncio
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import DateTime, Integer, String, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.app_services.schemas import Supplier
+from app.db.app_session import AppAsyncSessionLocal, Base
+
+# batas jumlah parameter per query sqlite
+_SQLITE_BATCH = 500
+
+
+class ProductCode(Base):
+    __tablename__ = "product_code"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kode: Mapped[str] = mapped_column(String(255), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+def _fold(raw: str) -> str:
+    return "".join(str(raw).split()).upper()
+
+
+def normalize_kode(raw: str, aliases: dict[str, str] | None = None) -> str:
+    """Normalisasi kode: buang semua spasi, huruf besar, lalu terapkan alias."""
+    kode = _fold(raw)
+    if aliases:
+        return aliases.get(kode, kode)
+    return kode
+
+
+class KodeRegistry:
+    """Cache kode -> id di memori, kode baru langsung disimpan ke database."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = AppAsyncSessionLocal,
+    ):
+        self._session_factory = session_factory
+        self._ids: dict[str, int] = {}
+        self._kodes: dict[int, str] = {}
+        # kode mentah -> id, per supplier + alias karena alias bisa beda
+        self._raw_ids: dict[tuple, dict[str, int]] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def load(self) -> None:
+        """Muat semua kode yang sudah tersimpan."""
+        async with self._session_factory() as session:
+            rows = (await session.execute(select(ProductCode.id, ProductCode.kode))).all()
+        self._remember(rows)
+        logger.debug(f"kode registry: {len(self._ids)} kode dimuat")
+
+    def _remember(self, rows: Iterable[tuple[int, str]]) -> None:
+        for id_, kode in rows:
+            self._ids[kode] = id_
+            self._kodes[id_] = kode
+
+    def lookup(self, kode: str) -> int | None:
+        return self._ids.get(kode)
+
+    def kode_of(self, id_: int) -> str:
+        return self._kodes[id_]
+
+    async def _persist(self, kodes: set[str]) -> None:
+        async with self._lock:
+            # bisa saja sudah disimpan task lain selagi menunggu lock
+            missing = sorted(k for k in kodes if k not in self._ids)
+            if not missing:
+                return
+            known_max = max(self._kodes, default=0)
+            async with self._session_factory() as session:
+                # insert level tabel, bulk insert ORM jauh lebih lambat
+                await session.execute(
+                    insert(ProductCode.__table__).on_conflict_do_nothing(
+                        index_elements=[ProductCode.kode]
+                    ),
+                    [{"kode": k} for k in missing],
+                )
+                # kode baru mendapat id di atas id terbesar yang sudah dikenal
+                wanted = set(missing)
+                stored = [
+                    (id_, kode)
+                    for id_, kode in await session.execute(
+                        select(ProductCode.id, ProductCode.kode).where(
+                            ProductCode.id > known_max
+                        )
+                    )
+                    if kode in wanted
+                ]
+                # sisanya sudah disimpan proses lain sebelumnya
+                found = {kode for _, kode in stored}
+                rest = [k for k in missing if k not in found]
+                for i in range(0, len(rest), _SQLITE_BATCH):
+                    stored += (
+                        await session.execute(
+                            select(ProductCode.id, ProductCode.kode).where(
+                                ProductCode.kode.in_(rest[i : i + _SQLITE_BATCH])
+                            )
+                        )
+                    ).all()
+                await session.commit()
+            self._remember(stored)
+            logger.debug(f"kode registry: {len(missing)} kode baru")
+
+    async def intern_many(
+        self, raw_kodes: Iterable[str], supplier: Supplier | None = None
+    ) -> np.ndarray:
+        """Normalisasi lalu ubah kode ke array id (int32), kode baru ikut disimpan."""
+        aliases = (
+            {_fold(k): _fold(v) for k, v in supplier.kode_aliases().items()}
+            if supplier
+            else {}
+        )
+        key = (supplier.name if supplier else None, tuple(sorted(aliases.items())))
+        cache = self._raw_ids.setdefault(key, {})
+        raw = list(raw_kodes)
+        ids = np.fromiter(
+            map(cache.get, raw, repeat(-1)), dtype=np.int32, count=len(raw)
+        )
+        unseen_rows = np.flatnonzero(ids < 0)
+        if not len(unseen_rows):
+            return ids
+
+        unseen = {raw[i] for i in unseen_rows.tolist()}
+        # normalisasi bisa ratusan ribu kode saat cold start, jangan tahan event loop
+        normalized = await asyncio.to_thread(
+            lambda: {k: normalize_kode(k, aliases) for k in unseen}
+        )
+        missing = {k for k in normalized.values() if k not in self._ids}
+        if missing:
+            await self._persist(missing)
+        cache.update((k, self._ids[n]) for k, n in normalized.items())
+        ids[unseen_rows] = [cache[raw[i]] for i in unseen_rows.tolist()]
+        return ids
@@ -0,0 +1,366 @@
+"""outbox untuk push delta harga ke otomax.
+
+delta hasil scrape ditulis dulu ke tabel outbox di database aplikasi (sqlite),
+lalu pusher di background mengirimnya ke otomax per batch. baris yang sudah
+di-commit di otomax ditandai `applied`, jadi kalau aplikasi crash atau sqlserver
+mati di tengah push, push berikutnya lanjut dari baris pending terakhir tanpa
+perlu re-sync semua supplier.
+
+update ke otomax bersifat absolut (set harga = x), jadi mengirim ulang batch yang
+sama setelah crash tidak mengubah hasil. idempotency key dihitung dari isi delta
+dan unik di antara baris pending, jadi delta yang dihitung ulang setelah crash
+tidak masuk outbox dua kali, tapi perubahan harga yang berulang (naik, turun, naik
+lagi) tetap terkirim.
+
+otomax mati (koneksi, login, timeout, driver tidak tersedia) tidak dihitung
+sebagai percobaan gagal, baris tetap pending sampai otomax bisa dihubungi lagi.
+
+baris yang ditolak otomax (produk tidak ada, data tidak valid) dipisahkan dari
+batch-nya dan ditandai `failed` setelah `max_attempts` kali gagal, supaya satu baris
+rusak tidak menahan seluruh outbox.
+"""
+
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import StrEnum
+
+from loguru import logger
+from sqlalchemy import DateTime, Index, Integer, String, func, select, text, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.app_services.schemas import DeltaKind, ProductDelta, Supplier
+from app.db.app_session import AppAsyncSessionLocal, Base
+from app.db.oto_session import get_sqlserver_sessionmaker
+
+# sesuaikan dengan skema produk di otomax
+OTOMAX_UPDATE_SQL = text(
+    "UPDATE produk SET harga_beli = :harga, aktif = :aktif "
+    "WHERE kode = :kode AND kode_modul = :id_oto_modul"
+)
+OTOMAX_INSERT_SQL = text(
+    "INSERT INTO produk (kode, nama, harga_beli, aktif, kode_modul) "
+    "VALUES (:kode, :deskripsi, :harga, :aktif, :id_oto_modul)"
+)
+
+
+class OutboxStatus(StrEnum):
+    PENDING = "pending"
+    APPLIED = "applied"
+    SUPERSEDED = "superseded"
+    FAILED = "failed"
+
+
+# idempotency key hanya unik di antara baris yang belum dikirim
+_PENDING_ONLY = text(f"state = '{OutboxStatus.PENDING}'")
+
+
+class OutboxEntry(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index(
+            "ix_outbox_pending_key",
+            "idempotency_key",
+            unique=True,
+            sqlite_where=_PENDING_ONLY,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    idempotency_key: Mapped[str] = mapped_column(String(40))
+    supplier: Mapped[str] = mapped_column(String(255))
+    id_oto_modul: Mapped[int] = mapped_column(Integer)
+    kode: Mapped[str] = mapped_column(String(255))
+    deskripsi: Mapped[str] = mapped_column(String(255), default="")
+    harga: Mapped[int] = mapped_column(Integer)
+    status: Mapped[str] = mapped_column(String(8))
+    kind: Mapped[str] = mapped_column(String(16))
+    state: Mapped[str] = mapped_column(
+        String(16), default=OutboxStatus.PENDING, index=True
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    applied_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+def idempotency_key(supplier: Supplier, delta: ProductDelta) -> str:
+    raw = (
+        f"{supplier.id_oto_modul}|{delta.kode}|{delta.kind}|{delta.harga}|"
+        f"{delta.status}|{delta.harga_lama}|{delta.status_lama}"
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def enqueue_deltas(
+    supplier: Supplier,
+    deltas: list[ProductDelta],
+    session_factory: async_sessionmaker[AsyncSession] = AppAsyncSessionLocal,
+) -> None:
+    """Tulis delta ke outbox. Delta yang sama dengan baris pending diabaikan."""
+    if not deltas:
+        return
+    rows = [
+        {
+            "idempotency_key": idempotency_key(supplier, d),
+            "supplier": supplier.name,
+            "id_oto_modul": supplier.id_oto_modul,
+            "kode": d.kode,
+            "deskripsi": d.deskripsi,
+            "harga": d.harga,
+            "status": d.status,
+            "kind": d.kind,
+            "state": OutboxStatus.PENDING,
+            "attempts": 0,
+        }
+        for d in deltas
+    ]
+    stmt = insert(OutboxEntry).on_conflict_do_nothing(
+        index_elements=[OutboxEntry.idempotency_key],
+        index_where=_PENDING_ONLY,
+    )
+    async with session_factory() as session:
+        await session.execute(stmt, rows)
+        await session.commit()
+    logger.debug(f"[{supplier.name}] {len(rows)} delta masuk outbox")
+
+
+class OtomaxUnavailable(Exception):
+    """Koneksi ke otomax tidak bisa dibuat (driver, konfigurasi engine)."""
+
+
+def is_outage(exc: BaseException) -> bool:
+    """True kalau error berarti otomax tidak bisa dihubungi, bukan data yang salah."""
+    if isinstance(
+        exc,
+        (
+            OtomaxUnavailable,
+            OperationalError,
+            InterfaceError,
+            PoolTimeoutError,
+            TimeoutError,
+            OSError,
+        ),
+    ):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+class OtomaxWriter(ABC):
+    @abstractmethod
+    async def apply(self, entries: list[OutboxEntry]) -> dict[int, str]:
+        """Tulis entry ke otomax dalam satu transaksi.
+
+        Return `{id entry: alasan}` untuk entry yang tidak bisa diterapkan (mis.
+        produk tidak ada di otomax). Raise kalau transaksi gagal, error yang
+        lolos `is_outage` membuat baris tetap pending.
+        """
+
+
+class SqlOtomaxWriter(OtomaxWriter):
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+    ):
+        self._session_factory = session_factory
+
+    async def apply(self, entries: list[OutboxEntry]) -> dict[int, str]:
+        session_factory = self._session_factory
+        if session_factory is None:
+            try:
+                session_factory = get_sqlserver_sessionmaker()
+            except Exception as e:
+                raise OtomaxUnavailable(f"engine otomax gagal dibuat: {e}") from e
+        rejected: dict[int, str] = {}
+        async with session_factory() as session:
+            for e in entries:
+                params = {
+                    "harga": e.harga,
+                    "aktif": 1 if e.status == "1" else 0,
+                    "kode": e.kode,
+                    "deskripsi": e.deskripsi,
+                    "id_oto_modul": e.id_oto_modul,
+                }
+                result = await session.execute(OTOMAX_UPDATE_SQL, params)
+                if result.rowcount:
+                    continue
+                # produk baru belum ada di otomax, update tidak mengenai baris apa pun
+                if e.kind == DeltaKind.NEW:
+                    await session.execute(OTOMAX_INSERT_SQL, params)
+                else:
+                    rejected[e.id] = "produk tidak ditemukan di otomax"
+            await session.commit()
+        return rejected
+
+
+class OutboxPusher:
+    """Kuras outbox ke otomax per batch, terpisah dari loop scrape."""
+
+    def __init__(
+        self,
+        writer: OtomaxWriter | None = None,
+        session_factory: async_sessionmaker[AsyncSession] = AppAsyncSessionLocal,
+        batch_size: int = 500,
+        idle_interval: float = 5.0,
+        max_backoff: float = 300.0,
+        max_attempts: int = 5,
+    ):
+        self._writer = writer or SqlOtomaxWriter()
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+    async def _apply_isolated(
+        self, entries: list[OutboxEntry]
+    ) -> tuple[list[OutboxEntry], dict[int, str]]:
+        """Kirim satu per satu untuk memisahkan baris yang ditolak otomax."""
+        applied: list[OutboxEntry] = []
+        errors: dict[int, str] = {}
+        for e in entries:
+            try:
+                rejected = await self._writer.apply([e])
+            except Exception as exc:
+                if is_outage(exc):
+                    raise
+                rejected = {e.id: str(exc)}
+            if rejected:
+                errors.update(rejected)
+            else:
+                applied.append(e)
+        return applied, errors
+
+    async def push_batch(self) -> int:
+        """Kirim satu batch pending. Return jumlah baris yang diproses, 0 kalau kosong.
+
+        Raise kalau otomax tidak bisa dihubungi, baris tetap pending.
+        """
+        async with self._session_factory() as session:
+            entries = list(
+                (
+                    await session.scalars(
+                        select(OutboxEntry)
+                        .where(OutboxEntry.state == OutboxStatus.PENDING)
+                        .order_by(OutboxEntry.id)
+                        .limit(self.batch_size)
+                    )
+                ).all()
+            )
+            if not entries:
+                return 0
+
+            # Delta lama untuk produk yang sama tidak perlu dikirim. Kalau yang
+            # dilewati adalah NEW, produk belum ada di otomax: delta terakhir
+            # harus tetap insert.
+            latest: dict[tuple[int, str], OutboxEntry] = {}
+            has_new: set[tuple[int, str]] = set()
+            for e in entries:
+                key = (e.id_oto_modul, e.kode)
+                latest[key] = e
+                if e.kind == DeltaKind.NEW:
+                    has_new.add(key)
+            for key in has_new:
+                if latest[key].kind == DeltaKind.CHANGED:
+                    latest[key].kind = DeltaKind.NEW
+            to_push = list(latest.values())
+            superseded = [
+                e.id for e in entries if latest[(e.id_oto_modul, e.kode)] is not e
+            ]
+
+            try:
+                try:
+                    errors = await self._writer.apply(to_push)
+                    applied = [e for e in to_push if e.id not in errors]
+                except Exception as exc:
+                    if is_outage(exc):
+                        raise
+                    # ada baris yang bikin transaksi gagal, cari baris mana
+                    applied, errors = await self._apply_isolated(to_push)
+            except Exception as exc:
+                # otomax mati atau koneksi putus: semua tetap pending, coba lagi nanti
+                await session.execute(
+                    update(OutboxEntry)
+                    .where(OutboxEntry.id.in_([e.id for e in to_push]))
+                    .values(last_error=str(exc)[:1024])
+                )
+                await session.commit()
+                raise
+
+            now = datetime.now()
+            if applied:
+                await session.execute(
+                    update(OutboxEntry)
+                    .where(OutboxEntry.id.in_([e.id for e in applied]))
+                    .values(
+                        state=OutboxStatus.APPLIED,
+                        attempts=OutboxEntry.attempts + 1,
+                        applied_at=now,
+                    )
+                )
+            if superseded:
+                await session.execute(
+                    update(OutboxEntry)
+                    .where(OutboxEntry.id.in_(superseded))
+                    .values(state=OutboxStatus.SUPERSEDED, applied_at=now)
+                )
+            dead = 0
+            for e in to_push:
+                if e.id not in errors:
+                    continue
+                failed = e.attempts + 1 >= self.max_attempts
+                dead += failed
+                await session.execute(
+                    update(OutboxEntry)
+                    .where(OutboxEntry.id == e.id)
+                    .values(
+                        attempts=OutboxEntry.attempts + 1,
+                        last_error=errors[e.id][:1024],
+                        state=OutboxStatus.FAILED if failed else OutboxStatus.PENDING,
+                    )
+                )
+            await session.commit()
+
+        log = logger.warning if errors else logger.info
+        log(
+            f"outbox: {len(applied)} delta terkirim ke otomax, "
+            f"{len(superseded)} dilewati, {len(errors)} ditolak ({dead} failed)"
+        )
+        return len(entries)
+
+    async def drain(self) -> int:
+        """Kirim semua pending sampai kosong atau sampai otomax gagal."""
+        total = 0
+        while True:
+            try:
+                done = await self.push_batch()
+            except Exception as e:
+                logger.error(f"outbox: gagal push ke otomax, lanjut di run berikutnya: {e}")
+                return total
+            if not done:
+                return total
+            total += done
+
+    async def run_forever(self, stop: asyncio.Event | None = None) -> None:
+        """Loop pusher di background dengan backoff kalau otomax lambat atau mati."""
+        stop = stop or asyncio.Event()
+        backoff = self.idle_interval
+        while not stop.is_set():
+            try:
+                done = await self.push_batch()
+                backoff = self.idle_interval
+            except Exception as e:
+                logger.error(f"outbox: gagal push ke otomax, retry {backoff:.0f}s: {e}")
+                done = 0
+                backoff = min(backoff * 2, self.max_backoff)
+            if done:
+                continue
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=backoff)
+            except TimeoutError:
+                pass
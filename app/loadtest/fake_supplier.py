@@ -0,0 +1,210 @@
+"""farm supplier palsu untuk load test, tanpa menyentuh supplier asli.
+
+satu app HTTP (starlette) melayani banyak supplier sekaligus:
+
+    /json/{sid}  -> {"data": [{"kode", "keterangan", "price", "status"}, ...]}
+    /html/{sid}  -> halaman dengan `table.tabel` (kode, keterangan, harga, status)
+
+ukuran katalog, latency, error rate, ETag dan perubahan harga (churn) bisa diatur
+lewat `FarmConfig`. harga berubah per "tick" (`churn_interval` detik), jadi selama
+satu tick body dan ETag-nya sama.
+"""
+
+import asyncio
+import hashlib
+import html
+import json
+import random
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import uvicorn
+from pydantic import BaseModel
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.app_services.schemas import Supplier, WebResponseType
+
+
+class FarmConfig(BaseModel):
+    catalog_size: int = 500
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    etag: bool = True
+    churn: float = 0.02
+    churn_interval: float = 60.0
+    gzip: bool = True
+    seed: int = 42
+
+
+class FarmStats(BaseModel):
+    requests: int = 0
+    errors: int = 0
+    not_modified: int = 0
+
+
+class _Catalog:
+    """Katalog satu supplier, harga per tick diturunkan dari seed + tick."""
+
+    def __init__(self, sid: int, cfg: FarmConfig):
+        rng = random.Random(cfg.seed * 100_003 + sid)
+        self.sid = sid
+        self.cfg = cfg
+        self.kode = [f"S{sid}P{i:05d}" for i in range(cfg.catalog_size)]
+        self.deskripsi = [f"Produk {i} supplier {sid}" for i in range(cfg.catalog_size)]
+        self.base = [rng.randrange(1_000, 500_000, 25) for _ in range(cfg.catalog_size)]
+        self._cache: dict[tuple[int, str], tuple[bytes, str]] = {}
+
+    def _prices(self, tick: int) -> tuple[list[int], list[str]]:
+        rng = random.Random(hash((self.cfg.seed, self.sid, tick)))
+        harga = list(self.base)
+        status = ["1"] * len(harga)
+        n_churn = int(len(harga) * self.cfg.churn)
+        for i in rng.sample(range(len(harga)), n_churn):
+            harga[i] = max(25, harga[i] + rng.randrange(-500, 525, 25))
+            if rng.random() < 0.1:
+                status[i] = "0"
+        return harga, status
+
+    def render(self, tick: int, fmt: str) -> tuple[bytes, str]:
+        """Body dan ETag untuk tick ini, di-cache supaya farm bukan bottleneck."""
+        key = (tick, fmt)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        harga, status = self._prices(tick)
+        if fmt == "json":
+            body = json.dumps(
+                {
+                    "data": [
+                        {"kode": k, "keterangan": d, "price": h, "status": s}
+                        for k, d, h, s in zip(self.kode, self.deskripsi, harga, status)
+                    ]
+                }
+            ).encode()
+        else:
+            # harga format rupiah: 12.500
+            rows = "".join(
+                f"<tr><td>{k}</td><td>{html.escape(d)}</td>"
+                f"<td>{f'{h:,}'.replace(',', '.')}</td>"
+                f"<td>{'Open' if s == '1' else 'Gangguan'}</td></tr>"
+                for k, d, h, s in zip(self.kode, self.deskripsi, harga, status)
+            )
+            body = (
+                "<html><body><table class='tabel'>"
+                "<tr><td>Kode</td><td>Keterangan</td><td>Harga</td><td>Status</td></tr>"
+                f"{rows}</table></body></html>"
+            ).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        self._cache = {key: (body, etag)}
+        return body, etag
+
+
+def create_farm_app(cfg: FarmConfig, stats: FarmStats | None = None) -> Starlette:
+    stats = stats if stats is not None else FarmStats()
+    catalogs: dict[int, _Catalog] = {}
+    rng = random.Random(cfg.seed)
+
+    async def serve(request: Request) -> Response:
+        stats.requests += 1
+        fmt = request.url.path.split("/")[1]
+        sid = int(request.path_params["sid"])
+
+        delay = cfg.latency_ms + rng.uniform(-1, 1) * cfg.latency_jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < cfg.error_rate:
+            stats.errors += 1
+            return Response("supplier error", status_code=503)
+
+        catalog = catalogs.get(sid)
+        if catalog is None:
+            catalog = catalogs[sid] = _Catalog(sid, cfg)
+        tick = int(time.time() // cfg.churn_interval)
+        body, etag = catalog.render(tick, fmt)
+
+        headers = {"ETag": etag} if cfg.etag else {}
+        if cfg.etag and request.headers.get("if-none-match") == etag:
+            stats.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        media_type = "application/json" if fmt == "json" else "text/html; charset=utf-8"
+        return Response(body, media_type=media_type, headers=headers)
+
+    middleware = [Middleware(GZipMiddleware, minimum_size=500)] if cfg.gzip else []
+    app = Starlette(
+        routes=[
+            Route("/json/{sid:int}", serve),
+            Route("/html/{sid:int}", serve),
+        ],
+        middleware=middleware,
+    )
+    app.state.stats = stats
+    return app
+
+
+def farm_suppliers(base_url: str, count: int, html_ratio: float = 0.5) -> list[Supplier]:
+    """Supplier yang menunjuk ke farm, sebagian JSON dan sebagian HTML."""
+    n_html = int(count * html_ratio)
+    suppliers = []
+    for sid in range(count):
+        is_html = sid < n_html
+        suppliers.append(
+            Supplier(
+                name=f"Fake Supplier {sid}",
+                url_harga=f"{base_url}/{'html' if is_html else 'json'}/{sid}",
+                id_oto_modul=sid,
+                web_response_type=WebResponseType.HTML if is_html else WebResponseType.JSON,
+                mapping={
+                    "kode": "kode",
+                    "deskripsi": "keterangan",
+                    "harga": "harga" if is_html else "price",
+                    "status": "status",
+                },
+                status_mapping={"open": "1", "gangguan": "0"}
+                if is_html
+                else {"1": "1", "0": "0"},
+            )
+        )
+    return suppliers
+
+
+@asynccontextmanager
+async def run_farm(
+    cfg: FarmConfig, host: str = "127.0.0.1", port: int = 8765
+) -> AsyncIterator[tuple[str, FarmStats]]:
+    """Jalankan farm di event loop yang sama, return (base_url, stats).
+
+    `port=0` memakai port bebas dari OS, base_url berisi port yang dipakai.
+    """
+    stats = FarmStats()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_farm_app(cfg, stats),
+            host=host,
+            port=port,
+            log_level="warning",
+            access_log=False,
+        )
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://{host}:{port}", stats
+    finally:
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    # jalankan farm terpisah supaya CPU server tidak ikut terukur di load test
+    uvicorn.run(create_farm_app(FarmConfig()), host="127.0.0.1", port=8765)
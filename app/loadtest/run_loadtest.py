@@ -0,0 +1,251 @@
+"""load test pipeline fetch terhadap farm supplier palsu.
+
+menjalankan `FetchContext` asli (http pool, dekompresi, parser, price guard) untuk
+jumlah supplier yang makin besar, lalu melaporkan throughput, latency p50/p99 dan
+memori per langkah. ETag dari farm dikirim balik sebagai `If-None-Match`, jadi
+mulai round kedua supplier yang harganya belum berubah dijawab 304 (kolom `304`).
+
+    python -m app.loadtest.run_loadtest --suppliers 50 100 250 500
+    python -m app.loadtest.run_loadtest --farm-url http://host:8765  # farm terpisah
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from contextlib import asynccontextmanager
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.app_services.fetch_strategy import FetchContext
+from app.app_services.http_pool import get_http_pool
+from app.app_services.price_guard import check_snapshot
+from app.app_services.schemas import ProductInDB, Supplier
+from app.app_services.transfer import (
+    NotModified,
+    clear_etags,
+    commit_etag,
+    get_transfer_stats,
+)
+from app.config.settings import get_settings
+from app.loadtest.fake_supplier import FarmConfig, FarmStats, farm_suppliers, run_farm
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+class StepResult(BaseModel):
+    suppliers: int
+    requests: int
+    failed: int
+    not_modified: int
+    products: int
+    seconds: float
+    p50_ms: float
+    p99_ms: float
+    peak_mb: float | None
+    wire_mb: float
+    decoded_mb: float
+
+    @property
+    def suppliers_per_sec(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    @property
+    def products_per_sec(self) -> float:
+        return self.products / self.seconds if self.seconds else 0.0
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux dalam KB, macOS dalam byte
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+async def _fetch_one(
+    supplier: Supplier, previous: dict[str, list[ProductInDB]]
+) -> tuple[float, int | None, bool]:
+    """Return (latency ms, jumlah produk, not modified).
+
+    Jumlah produk None kalau fetch gagal. Response 304 tidak diparse, snapshot
+    sebelumnya tetap dipakai.
+    """
+    started = time.perf_counter()
+    url = str(supplier.url_harga)
+    try:
+        products = await FetchContext(supplier).fetch(supplier)
+    except NotModified:
+        return (time.perf_counter() - started) * 1000, 0, True
+    if products is not None:
+        check_snapshot(previous.get(supplier.name, []), products, get_settings().GUARD)
+        previous[supplier.name] = products
+        commit_etag(url)
+    latency = (time.perf_counter() - started) * 1000
+    return latency, None if products is None else len(products), False
+
+
+async def run_step(
+    suppliers: list[Supplier], rounds: int, trace_memory: bool
+) -> StepResult:
+    previous: dict[str, list[ProductInDB]] = {}
+    latencies: list[float] = []
+    products = failed = not_modified = 0
+    get_transfer_stats().clear()
+    clear_etags()
+    if trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        results = await asyncio.gather(*(_fetch_one(s, previous) for s in suppliers))
+        for latency, count, unchanged in results:
+            latencies.append(latency)
+            not_modified += unchanged
+            if count is None:
+                failed += 1
+            else:
+                products += count
+    seconds = time.perf_counter() - started
+
+    if trace_memory:
+        peak_mb: float | None = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    else:
+        peak_mb = _max_rss_mb()
+
+    stats = get_transfer_stats().values()
+    return StepResult(
+        suppliers=len(suppliers),
+        requests=len(latencies),
+        failed=failed,
+        not_modified=not_modified,
+        products=products,
+        seconds=seconds,
+        p50_ms=percentile(latencies, 50),
+        p99_ms=percentile(latencies, 99),
+        peak_mb=peak_mb,
+        wire_mb=sum(s.wire_bytes for s in stats) / 1024 / 1024,
+        decoded_mb=sum(s.decoded_bytes for s in stats) / 1024 / 1024,
+    )
+
+
+def print_report(results: list[StepResult], farm: FarmStats | None) -> None:
+    header = (
+        f"{'suppliers':>9} {'req':>6} {'gagal':>6} {'304':>6} {'req/s':>8} "
+        f"{'produk/s':>10} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'mem MB':>8} {'wire MB':>8} {'decoded MB':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        mem = f"{r.peak_mb:.1f}" if r.peak_mb is not None else "-"
+        print(
+            f"{r.suppliers:>9} {r.requests:>6} {r.failed:>6} {r.not_modified:>6} "
+            f"{r.suppliers_per_sec:>8.1f} "
+            f"{r.products_per_sec:>10.0f} {r.p50_ms:>8.1f} {r.p99_ms:>8.1f} {mem:>8} "
+            f"{r.wire_mb:>8.2f} {r.decoded_mb:>10.2f}"
+        )
+    if farm is not None:
+        print(
+            f"\nfarm: {farm.requests} request, {farm.errors} error disuntikkan, "
+            f"{farm.not_modified} not modified"
+        )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load test fetcher dengan supplier palsu."
+    )
+    parser.add_argument(
+        "--suppliers", type=int, nargs="+", default=[50, 100, 250, 500]
+    )
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--catalog", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--churn", type=float, default=0.02)
+    parser.add_argument("--html-ratio", type=float, default=0.5)
+    parser.add_argument("--no-etag", action="store_true")
+    parser.add_argument("--no-gzip", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--farm-url", default=None, help="Pakai farm yang sudah jalan di proses lain."
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Ukur peak memori python dengan tracemalloc (lebih lambat).",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> list[StepResult]:
+    args = parse_args(argv)
+    if not args.verbose:
+        # error fetch yang disengaja (--error-rate) tidak perlu dicetak satu per satu
+        logger.remove()
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            filter=lambda r: "gagal fetch" not in r["message"],
+        )
+
+    pool = get_http_pool()
+    if args.concurrency is not None:
+        await pool.apply(
+            get_settings().FETCH.model_copy(update={"concurrency": args.concurrency})
+        )
+
+    farm_cfg = FarmConfig(
+        catalog_size=args.catalog,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        etag=not args.no_etag,
+        churn=args.churn,
+        gzip=not args.no_gzip,
+    )
+
+    @asynccontextmanager
+    async def farm():
+        if args.farm_url:
+            yield args.farm_url.rstrip("/"), None
+        else:
+            async with run_farm(farm_cfg, port=args.port) as running:
+                yield running
+
+    results: list[StepResult] = []
+    async with farm() as (base_url, farm_stats):
+        for count in args.suppliers:
+            suppliers = farm_suppliers(base_url, count, args.html_ratio)
+            result = await run_step(suppliers, args.rounds, args.trace_memory)
+            logger.info(
+                f"{count} supplier: {result.suppliers_per_sec:.1f} req/s, "
+                f"p99 {result.p99_ms:.0f} ms"
+            )
+            results.append(result)
+    await pool.aclose()
+
+    print_report(results, farm_stats)
+    return results
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
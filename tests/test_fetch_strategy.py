@@ -0,0 +1,84 @@
+import pytest
+
+from app.app_services.fetch_strategy import TabelRowParser, html_row_to_item
+from app.app_services.schemas import Supplier, WebResponseType
+
+PAGE = """<html><body>
+<table class="header"><tr><td>bukan tabel harga</td></tr></table>
+<table class="tabel striped">
+  <tr><td>Kode</td><td>Keterangan</td><td>Harga</td><td>Status</td></tr>
+  <tr><td> TSEL5 </td><td>Telkomsel&nbsp;5rb &amp; bonus</td>
+      <td>5.125</td><td><span class="ok"><b>Open</b></span></td></tr>
+  <tr><td>PLN20</td><td>Token <i>PLN</i> 20rb</td><td>20,350</td><td>Gangguan</td></tr>
+</table>
+</body></html>"""
+
+EXPECTED = [
+    ["Kode", "Keterangan", "Harga", "Status"],
+    ["TSEL5", "Telkomsel\xa05rb & bonus", "5.125", "Open"],
+    ["PLN20", "TokenPLN20rb", "20,350", "Gangguan"],
+]
+
+
+def _parse(chunks) -> list[list[str]]:
+    parser = TabelRowParser()
+    rows = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        rows += parser.pop_rows()
+    parser.close()
+    return rows + parser.pop_rows()
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64, len(PAGE)])
+def test_rows_are_same_for_any_chunk_split(size):
+    chunks = [PAGE[i : i + size] for i in range(0, len(PAGE), size)]
+
+    assert _parse(chunks) == EXPECTED
+
+
+def test_unclosed_cells_and_rows():
+    page = (
+        '<table class="tabel"><tr><td>A1<td>Satu<td>1.000<td>Open'
+        "<tr><td>A2<td>Dua<td>2.000<td>Open</table>"
+        '<table class="tabel"><tr><td>A3<td>Tiga<td>3.000<td>Open'
+    )
+
+    assert _parse([page]) == [
+        ["A1", "Satu", "1.000", "Open"],
+        ["A2", "Dua", "2.000", "Open"],
+        ["A3", "Tiga", "3.000", "Open"],
+    ]
+
+
+def _supplier() -> Supplier:
+    return Supplier(
+        name="HTML",
+        url_harga="http://supplier.test/harga",
+        id_oto_modul=2,
+        web_response_type=WebResponseType.HTML,
+        mapping={
+            "kode": "kode",
+            "deskripsi": "keterangan",
+            "harga": "harga",
+            "status": "status",
+        },
+        status_mapping={"1": "Open", "0": "Gangguan"},
+        is_active=True,
+    )
+
+
+def test_html_row_to_item_skips_header_and_cleans_harga():
+    supplier = _supplier()
+    items = [html_row_to_item(cols, supplier) for cols in EXPECTED]
+
+    assert items[0] is None
+    assert items[1] == {
+        "kode": "TSEL5",
+        "keterangan": "Telkomsel\xa05rb & bonus",
+        "harga": "5125",
+        "status": "Open",
+    }
+    assert items[2]["harga"] == "20350"
+    assert html_row_to_item(["X", "Rusak", "Rp -", "Open"], supplier)["harga"] == "0"
+    assert html_row_to_item(["X", "kurang kolom"], supplier) is None
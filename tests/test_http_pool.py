@@ -0,0 +1,55 @@
+import asyncio
+
+from app.app_services.http_pool import HttpPool, ResizableLimiter
+from app.config.values import ConfigFetcher
+
+
+def test_limiter_resize_wakes_waiters_and_shrinks():
+    async def run() -> list[int]:
+        limiter = ResizableLimiter(1)
+        active = peak = 0
+        peaks: list[int] = []
+
+        async def work() -> None:
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.02)
+                active -= 1
+
+        tasks = [asyncio.create_task(work()) for _ in range(4)]
+        await asyncio.sleep(0.005)
+        await limiter.resize(3)
+        await asyncio.gather(*tasks)
+        peaks.append(peak)
+
+        await limiter.resize(1)
+        peak = 0
+        await asyncio.gather(*(work() for _ in range(3)))
+        peaks.append(peak)
+        return peaks
+
+    assert asyncio.run(run()) == [3, 1]
+
+
+def test_apply_retires_client_after_last_request():
+    async def run() -> None:
+        pool = HttpPool(ConfigFetcher(concurrency=2))
+        async with pool.acquire() as old:
+            await pool.apply(ConfigFetcher(concurrency=2, max_connections=10))
+            # request yang sedang jalan tetap memakai client lama
+            assert not old.is_closed
+            async with pool.acquire() as new:
+                assert new is not old
+        assert old.is_closed
+        assert not new.is_closed
+
+        await pool.apply(ConfigFetcher(concurrency=5, max_connections=10))
+        async with pool.acquire() as same:
+            assert same is new
+        assert pool.limiter.limit == 5
+        await pool.aclose()
+        assert new.is_closed
+
+    asyncio.run(run())
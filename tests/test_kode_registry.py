@@ -0,0 +1,80 @@
+import asyncio
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.app_services.schemas import Supplier, WebResponseType
+from app.db.app_session import Base
+from app.db.kode_registry import KodeRegistry, ProductCode, normalize_kode
+
+
+async def _registry() -> KodeRegistry:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return KodeRegistry(async_sessionmaker(engine, expire_on_commit=False))
+
+
+def _supplier(mapping: dict[str, str] | None = None) -> Supplier:
+    return Supplier(
+        name="Supplier Test",
+        url_harga="http://supplier.test/",
+        id_oto_modul=1,
+        web_response_type=WebResponseType.JSON,
+        mapping=mapping,
+    )
+
+
+def test_normalize_kode():
+    assert normalize_kode(" tsel 10 ") == "TSEL10"
+    assert normalize_kode("Tsel\t10\n") == "TSEL10"
+    assert normalize_kode("s10", {"S10": "TSEL10"}) == "TSEL10"
+    assert normalize_kode("x5", {"S10": "TSEL10"}) == "X5"
+
+
+def test_intern_uses_supplier_aliases():
+    supplier = _supplier({"kode": "kode", "kode:s 10": "tsel10"})
+
+    async def run():
+        registry = await _registry()
+        ids = await registry.intern_many(["TSEL10", "s10", "S 10", "x5"], supplier)
+        plain = await registry.intern_many(["s10"])
+        return registry, ids.tolist(), plain.tolist()
+
+    registry, ids, plain = asyncio.run(run())
+    assert ids[0] == ids[1] == ids[2] != ids[3]
+    assert registry.kode_of(ids[0]) == "TSEL10"
+    # tanpa supplier alias tidak berlaku
+    assert registry.kode_of(plain[0]) == "S10"
+
+
+def test_ids_survive_reload():
+    async def run():
+        registry = await _registry()
+        first = await registry.intern_many(["A", "B"])
+        fresh = KodeRegistry(registry._session_factory)
+        await fresh.load()
+        return first.tolist(), (await fresh.intern_many(["b", "a"])).tolist()
+
+    first, again = asyncio.run(run())
+    assert again == first[::-1]
+
+
+def test_concurrent_persist_assigns_one_id_per_kode():
+    kodes = [f"P{i}" for i in range(1_200)]
+
+    async def run():
+        registry = await _registry()
+        results = await asyncio.gather(
+            registry.intern_many(kodes[:800]),
+            registry.intern_many(kodes[400:]),
+            registry.intern_many(reversed(kodes)),
+        )
+        async with registry._session_factory() as session:
+            stored = await session.scalar(select(func.count(ProductCode.id)))
+        return registry, results, stored
+
+    registry, (a, b, c), stored = asyncio.run(run())
+    assert stored == len(registry) == 1_200
+    assert a.tolist()[400:] == b.tolist()[:400]
+    assert c.tolist()[::-1] == a.tolist() + b.tolist()[400:]
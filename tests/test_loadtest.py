@@ -0,0 +1,30 @@
+import asyncio
+
+from app.app_services import http_pool
+from app.app_services.http_pool import HttpPool
+from app.config.values import ConfigFetcher
+from app.loadtest.fake_supplier import FarmConfig, farm_suppliers, run_farm
+from app.loadtest.run_loadtest import run_step
+
+
+def test_run_step_against_local_farm(monkeypatch):
+    cfg = FarmConfig(catalog_size=30, latency_ms=0, latency_jitter_ms=0, churn=0)
+
+    async def run():
+        pool = HttpPool(ConfigFetcher(concurrency=4))
+        monkeypatch.setattr(http_pool, "_http_pool", pool)
+        try:
+            async with run_farm(cfg, port=0) as (base_url, stats):
+                suppliers = farm_suppliers(base_url, 4)
+                result = await run_step(suppliers, rounds=2, trace_memory=False)
+        finally:
+            await pool.aclose()
+        return result, stats
+
+    result, stats = asyncio.run(run())
+
+    assert (result.requests, result.failed) == (8, 0)
+    # round kedua dijawab 304 karena harga tidak berubah
+    assert result.not_modified == stats.not_modified == 4
+    assert result.products == 4 * 30
+    assert stats.requests == 8
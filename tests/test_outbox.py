@@ -0,0 +1,234 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.app_services.schemas import DeltaKind, ProductDelta, Supplier, WebResponseType
+from app.db.app_session import Base
+from app.db.outbox import (
+    OtomaxWriter,
+    OutboxEntry,
+    OutboxPusher,
+    OtomaxUnavailable,
+    OutboxStatus,
+    SqlOtomaxWriter,
+    enqueue_deltas,
+)
+
+SUPPLIER = Supplier(
+    name="Supplier Test",
+    url_harga="http://supplier.test/",
+    id_oto_modul=7,
+    web_response_type=WebResponseType.JSON,
+)
+
+
+def _delta(kode: str, harga: int, kind: DeltaKind = DeltaKind.CHANGED) -> ProductDelta:
+    return ProductDelta(kode=kode, deskripsi=f"Produk {kode}", harga=harga, status="1", kind=kind)
+
+
+async def _sessionmaker() -> async_sessionmaker[AsyncSession]:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _states(factory) -> dict[str, str]:
+    async with factory() as session:
+        rows = (await session.scalars(select(OutboxEntry))).all()
+    return {r.kode: r.state for r in rows}
+
+
+class RecordingWriter(OtomaxWriter):
+    def __init__(self, fail_with: Exception | None = None, bad_kode: str | None = None):
+        self.pushed: list[str] = []
+        self.fail_with = fail_with
+        self.bad_kode = bad_kode
+
+    async def apply(self, entries):
+        if self.fail_with is not None:
+            raise self.fail_with
+        if self.bad_kode and any(e.kode == self.bad_kode for e in entries):
+            raise IntegrityError("insert", {}, Exception("bad row"))
+        self.pushed += [e.kode for e in entries]
+        return {}
+
+
+async def _otomax() -> async_sessionmaker[AsyncSession]:
+    otomax = await _sessionmaker()
+    async with otomax() as session:
+        await session.execute(
+            text(
+                "CREATE TABLE produk (kode TEXT, nama TEXT, harga_beli INT, "
+                "aktif INT, kode_modul INT)"
+            )
+        )
+        await session.commit()
+    return otomax
+
+
+def test_enqueue_is_idempotent_and_push_marks_applied():
+    async def run():
+        factory = await _sessionmaker()
+        deltas = [_delta("A", 100), _delta("B", 200)]
+        await enqueue_deltas(SUPPLIER, deltas, factory)
+        await enqueue_deltas(SUPPLIER, deltas, factory)
+        writer = RecordingWriter()
+        await OutboxPusher(writer, factory).drain()
+        return writer.pushed, await _states(factory)
+
+    pushed, states = asyncio.run(run())
+    assert sorted(pushed) == ["A", "B"]
+    assert set(states.values()) == {OutboxStatus.APPLIED}
+
+
+def test_outage_keeps_rows_pending():
+    async def run():
+        factory = await _sessionmaker()
+        await enqueue_deltas(SUPPLIER, [_delta("A", 100)], factory)
+        down = RecordingWriter(fail_with=OperationalError("connect", {}, Exception("down")))
+        await OutboxPusher(down, factory, max_attempts=1).drain()
+        before = await _states(factory)
+        await OutboxPusher(RecordingWriter(), factory).drain()
+        return before, await _states(factory)
+
+    before, after = asyncio.run(run())
+    assert before == {"A": OutboxStatus.PENDING}
+    assert after == {"A": OutboxStatus.APPLIED}
+
+
+def test_bad_row_is_isolated_and_dead_lettered():
+    async def run():
+        factory = await _sessionmaker()
+        await enqueue_deltas(
+            SUPPLIER, [_delta("A", 1), _delta("BAD", 2), _delta("C", 3)], factory
+        )
+        writer = RecordingWriter(bad_kode="BAD")
+        await OutboxPusher(writer, factory, max_attempts=3).drain()
+        return writer.pushed, await _states(factory)
+
+    pushed, states = asyncio.run(run())
+    assert sorted(pushed) == ["A", "C"]
+    assert states == {
+        "A": OutboxStatus.APPLIED,
+        "BAD": OutboxStatus.FAILED,
+        "C": OutboxStatus.APPLIED,
+    }
+
+
+def test_sql_writer_inserts_new_and_rejects_missing():
+    async def run():
+        factory = await _sessionmaker()
+        otomax = await _sessionmaker()
+        async with otomax() as session:
+            await session.execute(
+                text(
+                    "CREATE TABLE produk (kode TEXT, nama TEXT, harga_beli INT, "
+                    "aktif INT, kode_modul INT)"
+                )
+            )
+            await session.execute(
+                text("INSERT INTO produk VALUES ('OLD', 'lama', 10, 1, 7)")
+            )
+            await session.commit()
+        await enqueue_deltas(
+            SUPPLIER,
+            [
+                _delta("OLD", 20),
+                _delta("NEW", 30, DeltaKind.NEW),
+                _delta("GONE", 40),
+            ],
+            factory,
+        )
+        await OutboxPusher(SqlOtomaxWriter(otomax), factory, max_attempts=1).drain()
+        async with otomax() as session:
+            rows = (
+                await session.execute(text("SELECT kode, harga_beli FROM produk ORDER BY kode"))
+            ).all()
+        return rows, await _states(factory)
+
+    rows, states = asyncio.run(run())
+    assert [tuple(r) for r in rows] == [("NEW", 30), ("OLD", 20)]
+    assert states == {
+        "OLD": OutboxStatus.APPLIED,
+        "NEW": OutboxStatus.APPLIED,
+        "GONE": OutboxStatus.FAILED,
+    }
+
+
+def test_recomputed_delta_is_not_enqueued_twice_but_repeat_change_is():
+    async def run():
+        factory = await _sessionmaker()
+        up = ProductDelta(
+            kode="A",
+            deskripsi="A",
+            harga=110,
+            status="1",
+            kind=DeltaKind.CHANGED,
+            harga_lama=100,
+            status_lama="1",
+        )
+        # crash sebelum snapshot diganti: delta yang sama dihitung ulang
+        await enqueue_deltas(SUPPLIER, [up], factory)
+        await enqueue_deltas(SUPPLIER, [up], factory)
+        async with factory() as session:
+            pending = len((await session.scalars(select(OutboxEntry))).all())
+        await OutboxPusher(RecordingWriter(), factory).drain()
+        # harga turun lalu naik lagi ke nilai yang sama
+        await enqueue_deltas(SUPPLIER, [up], factory)
+        writer = RecordingWriter()
+        await OutboxPusher(writer, factory).drain()
+        return pending, writer.pushed
+
+    pending, pushed_again = asyncio.run(run())
+    assert pending == 1
+    assert pushed_again == ["A"]
+
+
+def test_new_superseded_by_changed_still_inserts():
+    async def run():
+        factory = await _sessionmaker()
+        otomax = await _otomax()
+        # otomax mati lebih lama dari satu poll: NEW dan CHANGED satu batch
+        await enqueue_deltas(SUPPLIER, [_delta("P", 100, DeltaKind.NEW)], factory)
+        await enqueue_deltas(SUPPLIER, [_delta("P", 120)], factory)
+        await OutboxPusher(SqlOtomaxWriter(otomax), factory, max_attempts=1).drain()
+        async with otomax() as session:
+            rows = (
+                await session.execute(text("SELECT kode, harga_beli FROM produk"))
+            ).all()
+        async with factory() as session:
+            states = [e.state for e in await session.scalars(select(OutboxEntry))]
+        return [tuple(r) for r in rows], states
+
+    rows, states = asyncio.run(run())
+    assert rows == [("P", 120)]
+    assert states == [OutboxStatus.SUPERSEDED, OutboxStatus.APPLIED]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        InterfaceError("connect", {}, Exception("login failed")),
+        TimeoutError("query timeout"),
+        OtomaxUnavailable("no odbc driver"),
+        ConnectionResetError("reset by peer"),
+    ],
+    ids=["interface", "timeout", "engine", "socket"],
+)
+def test_infrastructure_errors_keep_rows_pending(error):
+    async def run():
+        factory = await _sessionmaker()
+        await enqueue_deltas(SUPPLIER, [_delta("A", 1), _delta("B", 2)], factory)
+        pusher = OutboxPusher(RecordingWriter(fail_with=error), factory, max_attempts=1)
+        for _ in range(3):
+            await pusher.drain()
+        async with factory() as session:
+            entries = await session.scalars(select(OutboxEntry))
+            return [(e.state, e.attempts) for e in entries]
+
+    assert asyncio.run(run()) == [(OutboxStatus.PENDING, 0)] * 2
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from app.app_services.price_archive import PriceArchive
+from app.app_services.schemas import DeltaKind, ProductDelta
+
+DAY = date(2025, 9, 1)
+
+
+def _delta(kode: str, harga: int) -> ProductDelta:
+    return ProductDelta(
+        kode=kode, deskripsi=kode, harga=harga, status="1", kind=DeltaKind.CHANGED
+    )
+
+
+def _at(minute: int) -> datetime:
+    return datetime(DAY.year, DAY.month, DAY.day, 10, minute)
+
+
+def test_compact_day_merges_chunks_and_keeps_history(tmp_path):
+    archive = PriceArchive(tmp_path)
+    for minute in range(5):
+        for supplier in ("Supplier A", "Supplier B"):
+            archive.append(supplier, [_delta("P1", 100 + minute)], _at(minute))
+    before = archive.changes_on(DAY)
+
+    archive.compact_day(DAY)
+
+    for part in (tmp_path / f"day={DAY.isoformat()}").iterdir():
+        assert len(list(part.glob("*.chunk"))) == 1
+    assert archive.changes_on(DAY) == before
+    assert {r.supplier for r in before} == {"Supplier A", "Supplier B"}
+    history = archive.price_of("P1", _at(0), _at(4), "Supplier A")
+    assert [r.harga for r in history] == [100, 101, 102, 103, 104]
+
+
+def test_append_during_compact_is_not_lost(tmp_path):
+    archive = PriceArchive(tmp_path)
+    for minute in range(20):
+        archive.append("Supplier A", [_delta(f"P{minute}", minute)], _at(minute))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        jobs = [
+            pool.submit(
+                archive.append, "Supplier A", [_delta(f"Q{i}", i)], _at(30 + i % 20)
+            )
+            for i in range(20)
+        ]
+        jobs.append(pool.submit(archive.compact, DAY, "Supplier A"))
+        for job in jobs:
+            job.result()
+
+    assert len(archive.changes_on(DAY, "Supplier A")) == 40
@@ -0,0 +1,228 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+from app.app_services.price_guard import (
+    GuardFlag,
+    GuardHold,
+    accept_all,
+    accepted_snapshot,
+    accepted_snapshot_ids,
+    apply_hold,
+    check_snapshot,
+)
+from app.app_services.schemas import DeltaKind, ProductInDB
+from app.config.values import ConfigPriceGuard
+
+
+def _product(kode: str, harga: int, status: str = "1") -> ProductInDB:
+    return ProductInDB(kode=kode, deskripsi=f"Produk {kode}", harga=harga, status=status)
+
+
+def _catalog(n: int) -> list[ProductInDB]:
+    return [_product(f"K{i:06d}", 1_000 + i) for i in range(n)]
+
+
+def test_diff_new_changed_removed():
+    previous = [_product("A", 100), _product("B", 200), _product("C", 300)]
+    current = [_product("A", 100), _product("B", 210, "0"), _product("D", 400)]
+
+    report = check_snapshot(previous, current, ConfigPriceGuard(min_rows=100))
+
+    by_kode = {d.kode: d for d in report.accepted}
+    assert not report.quarantined and not report.blocked
+    assert set(by_kode) == {"B", "C", "D"}
+    assert by_kode["B"].kind == DeltaKind.CHANGED
+    assert (by_kode["B"].harga_lama, by_kode["B"].status_lama) == (200, "1")
+    assert by_kode["C"].kind == DeltaKind.REMOVED and by_kode["C"].status == "0"
+    assert by_kode["D"].kind == DeltaKind.NEW and by_kode["D"].harga_lama is None
+
+
+def test_duplicate_kode_keeps_first_row():
+    previous = [_product("A", 100)]
+    current = [_product("A", 120), _product("A", 999), _product("N", 5), _product("N", 6)]
+
+    report = check_snapshot(previous, current)
+
+    assert [(d.kode, d.harga) for d in report.accepted] == [("N", 5), ("A", 120)]
+
+
+def test_zero_price_and_jump_are_quarantined():
+    previous = [_product("A", 100), _product("B", 100), _product("C", 100)]
+    current = [_product("A", 0), _product("B", 1_000), _product("C", 110)]
+
+    report = check_snapshot(previous, current, ConfigPriceGuard(min_rows=100))
+
+    flags = {q.delta.kode: q.flags for q in report.quarantined}
+    assert GuardFlag.ZERO_PRICE in flags["A"]
+    assert flags["B"] == [GuardFlag.PRICE_JUMP]
+    assert [d.kode for d in report.accepted] == ["C"]
+
+    snapshot = {p.kode: p.harga for p in accepted_snapshot(previous, current, report)}
+    assert snapshot == {"A": 100, "B": 100, "C": 110}
+
+
+def test_empty_snapshot_blocked_below_min_rows():
+    previous = [_product("A", 100)]
+
+    report = check_snapshot(previous, [], ConfigPriceGuard(min_rows=20))
+
+    assert report.blocked
+    assert report.snapshot_flags == [GuardFlag.EMPTY_SNAPSHOT]
+    assert accepted_snapshot(previous, [], report) == previous
+
+
+def test_first_snapshot_is_not_blocked():
+    report = check_snapshot([], [_product("A", 100)])
+
+    assert not report.blocked
+    assert [d.kind for d in report.accepted] == [DeltaKind.NEW]
+
+
+def test_mass_disappear_and_status_flip():
+    previous = _catalog(100)
+    half = previous[:50]
+    flipped = [_product(p.kode, p.harga, "0") for p in previous]
+
+    assert check_snapshot(previous, half).snapshot_flags == [GuardFlag.MASS_DISAPPEAR]
+    report = check_snapshot(previous, flipped)
+    assert report.snapshot_flags == [GuardFlag.MASS_STATUS_FLIP]
+    assert len(report.quarantined) == 100 and not report.accepted
+
+
+def test_registry_ids_match_string_join():
+    previous = [_product("A", 100), _product("B", 200)]
+    current = [_product("a", 150), _product("C", 300)]
+    # registry menormalisasi "a" ke id yang sama dengan "A"
+    report = check_snapshot(
+        previous,
+        current,
+        ConfigPriceGuard(min_rows=100),
+        current_ids=np.array([1, 3]),
+        previous_ids=np.array([1, 2]),
+    )
+
+    kinds = {d.kode: d.kind for d in report.accepted}
+    assert kinds == {"a": DeltaKind.CHANGED, "C": DeltaKind.NEW, "B": DeltaKind.REMOVED}
+
+
+def _best_ms(previous, current, rounds: int = 3) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        check_snapshot(previous, current)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    ("churn", "budget_ms"),
+    [(0.0, 400), (0.02, 400), (1.0, 1_500)],
+)
+def test_benchmark_100k_rows(churn, budget_ms):
+    previous = _catalog(100_000)
+    current = list(previous)
+    rng = random.Random(7)
+    for i in rng.sample(range(len(current)), int(len(current) * churn)):
+        current[i] = _product(current[i].kode, current[i].harga + 25)
+
+    elapsed = _best_ms(previous, current)
+
+    assert elapsed < budget_ms, f"{churn:.0%} churn: {elapsed:.0f} ms"
+
+
+@pytest.mark.benchmark
+def test_benchmark_100k_rows_cold_start():
+    current = _catalog(100_000)
+
+    elapsed = _best_ms([], current)
+
+    assert elapsed < 1_000, f"cold start: {elapsed:.0f} ms"
+
+
+def test_quarantined_jump_keeps_old_price_across_kode_spelling():
+    # registry menormalisasi "a" dan "A" ke id yang sama
+    previous = [_product("A", 100), _product("B", 200)]
+    current = [_product("a", 1_000), _product("B", 200)]
+    ids = dict(current_ids=np.array([1, 2]), previous_ids=np.array([1, 2]))
+
+    report = check_snapshot(previous, current, ConfigPriceGuard(min_rows=100), **ids)
+    snapshot = accepted_snapshot(previous, current, report, **ids)
+
+    assert [q.delta.kode for q in report.quarantined] == ["a"]
+    assert {p.kode: p.harga for p in snapshot} == {"A": 100, "B": 200}
+    assert accepted_snapshot_ids(previous, current, report, **ids).tolist() == [2, 1]
+
+    # run berikutnya tetap membandingkan dengan harga lama, bukan produk baru
+    again = check_snapshot(
+        snapshot,
+        current,
+        ConfigPriceGuard(min_rows=100),
+        current_ids=np.array([1, 2]),
+        previous_ids=np.array([2, 1]),
+    )
+    assert not again.accepted
+    assert [q.flags for q in again.quarantined] == [[GuardFlag.PRICE_JUMP]]
+
+
+def _run(previous, current, hold, cfg):
+    report = check_snapshot(previous, current, cfg)
+    report, hold = apply_hold(report, hold, current, cfg.rebaseline_after)
+    return accepted_snapshot(previous, current, report), report, hold
+
+
+def test_consistent_price_jump_becomes_new_baseline():
+    cfg = ConfigPriceGuard(min_rows=100, rebaseline_after=3)
+    baseline = [_product("A", 100), _product("Z", 100)]
+    jumped = [_product("A", 1_000), _product("Z", 0)]
+    hold = GuardHold()
+
+    for seen in (1, 2):
+        snapshot, report, hold = _run(baseline, jumped, hold, cfg)
+        assert {p.kode: p.harga for p in snapshot} == {"A": 100, "Z": 100}
+        assert hold.jumps["A"].seen == seen
+    snapshot, report, hold = _run(snapshot, jumped, hold, cfg)
+
+    # lonjakan dilepas, harga 0 tetap ditahan
+    assert [d.kode for d in report.accepted] == ["A"]
+    assert {p.kode: p.harga for p in snapshot} == {"A": 1_000, "Z": 100}
+    assert not hold.jumps
+
+
+def test_different_jump_restarts_count():
+    cfg = ConfigPriceGuard(min_rows=100, rebaseline_after=2)
+    baseline = [_product("A", 100)]
+
+    _, _, hold = _run(baseline, [_product("A", 1_000)], GuardHold(), cfg)
+    _, report, hold = _run(baseline, [_product("A", 2_000)], hold, cfg)
+
+    assert report.quarantined and hold.jumps["A"].seen == 1
+
+
+def test_blocked_snapshot_released_after_identical_observations():
+    cfg = ConfigPriceGuard(min_rows=5, rebaseline_after=2)
+    previous = _catalog(10)
+    current = previous[:3]
+
+    snapshot, report, hold = _run(previous, current, GuardHold(), cfg)
+    assert report.blocked and snapshot == previous and hold.snapshot_seen == 1
+
+    snapshot, report, hold = _run(previous, current, hold, cfg)
+    assert not report.blocked
+    assert sorted(p.kode for p in snapshot) == [p.kode for p in current]
+    assert hold == GuardHold()
+
+
+def test_empty_snapshot_needs_operator_accept():
+    cfg = ConfigPriceGuard(rebaseline_after=1)
+    previous = [_product("A", 100)]
+
+    _, report, _ = _run(previous, [], GuardHold(), cfg)
+    assert report.blocked
+
+    report = accept_all(check_snapshot(previous, [], cfg))
+    assert not report.blocked and not report.quarantined
+    assert accepted_snapshot(previous, [], report) == []
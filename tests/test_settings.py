@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+from app.config.settings import SettingsChanged, SettingsManager
+
+
+def _write(path, text: str | bytes) -> None:
+    data = text.encode() if isinstance(text, str) else text
+    path.write_bytes(data)
+    # pastikan mtime berubah walau resolusi filesystem kasar
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_dispatches_only_changed_sections(tmp_path):
+    env = tmp_path / ".env"
+    _write(env, "FETCH__CONCURRENCY=5\nGUARD__MIN_ROWS=10\n")
+    manager = SettingsManager(env)
+    seen: list[SettingsChanged] = []
+    awaited: list[int] = []
+
+    async def on_fetch_async(event: SettingsChanged) -> None:
+        awaited.append(event.new.concurrency)  # type: ignore[attr-defined]
+
+    def broken(event: SettingsChanged) -> None:
+        raise RuntimeError("listener rusak")
+
+    manager.subscribe("FETCH", broken)
+    manager.subscribe("FETCH", seen.append)
+    manager.subscribe("FETCH", on_fetch_async)
+    manager.subscribe("GUARD", seen.append)
+
+    _write(env, "FETCH__CONCURRENCY=8\nGUARD__MIN_ROWS=10\n")
+    events = asyncio.run(manager.reload())
+
+    assert [e.section for e in events] == ["FETCH"]
+    changes = [(e.old.concurrency, e.new.concurrency) for e in seen]  # type: ignore[attr-defined]
+    assert changes == [(5, 8)]
+    assert awaited == [8]
+    assert manager.current.FETCH.concurrency == 8
+
+
+def test_invalid_or_unreadable_env_keeps_old_settings(tmp_path):
+    env = tmp_path / ".env"
+    _write(env, "FETCH__CONCURRENCY=5\n")
+    manager = SettingsManager(env)
+
+    for bad in ("FETCH__CONCURRENCY=0\n", b"FETCH__CONCURRENCY=7\n\xff\xfe\n"):
+        _write(env, bad)
+        assert asyncio.run(manager.reload()) == []
+        assert manager.current.FETCH.concurrency == 5
+
+
+def test_watch_reloads_on_mtime_change_and_survives_errors(tmp_path):
+    env = tmp_path / ".env"
+    _write(env, "FETCH__INTERVAL=60\n")
+    manager = SettingsManager(env)
+    intervals: list[int] = []
+    manager.subscribe(
+        "FETCH",
+        lambda e: intervals.append(e.new.interval),  # type: ignore[attr-defined]
+    )
+
+    async def run() -> None:
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(manager.watch(interval=0.01, stop=stop))
+        await asyncio.sleep(0.05)
+        _write(env, b"FETCH__INTERVAL=90\n\xff\n")
+        await asyncio.sleep(0.05)
+        _write(env, "FETCH__INTERVAL=120\n")
+        await asyncio.sleep(0.05)
+        stop.set()
+        await watcher
+
+    asyncio.run(run())
+    assert intervals == [120]
@@ -0,0 +1,132 @@
+import asyncio
+import gzip
+import zlib
+
+import brotli
+import httpx
+import pytest
+import zstandard
+
+from app.app_services.transfer import (
+    NotModified,
+    clear_etags,
+    commit_etag,
+    get_transfer_stats,
+    open_stream,
+)
+
+BODY = (
+    b'{"data": ['
+    + b",".join(b'{"kode": "P%d", "price": %d}' % (i, i) for i in range(2000))
+    + b"]}"
+)
+
+
+def _zlib_raw(data: bytes) -> bytes:
+    obj = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return obj.compress(data) + obj.flush()
+
+
+def _zstd_multi_frame(data: bytes) -> bytes:
+    cctx = zstandard.ZstdCompressor()
+    half = len(data) // 2
+    return cctx.compress(data[:half]) + cctx.compress(data[half:])
+
+
+ENCODED = {
+    "gzip": gzip.compress(BODY),
+    "deflate": zlib.compress(BODY),
+    "br": brotli.compress(BODY),
+    "zstd": zstandard.ZstdCompressor().compress(BODY),
+}
+
+
+def _fetch(payload: bytes, encoding: str, chunk_size: int = 97) -> bytes:
+    async def stream():
+        for i in range(0, len(payload), chunk_size):
+            yield payload[i : i + chunk_size]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers = {"Content-Encoding": encoding} if encoding else {}
+        return httpx.Response(200, headers=headers, content=stream())
+
+    async def run() -> bytes:
+        body = bytearray()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with open_stream(client, "http://supplier.test/", "test") as s:
+                async for chunk in s:
+                    body += chunk
+        return bytes(body)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("encoding", sorted(ENCODED))
+def test_round_trip(encoding):
+    assert _fetch(ENCODED[encoding], encoding) == BODY
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_zstd_chunking(chunk_size):
+    assert _fetch(ENCODED["zstd"], "zstd", chunk_size) == BODY
+
+
+def test_zstd_multiple_frames():
+    assert _fetch(_zstd_multi_frame(BODY), "zstd") == BODY
+
+
+def test_raw_deflate_fallback():
+    assert _fetch(_zlib_raw(BODY), "deflate") == BODY
+
+
+def test_identity():
+    assert _fetch(BODY, "") == BODY
+
+
+def test_stacked_encodings():
+    payload = gzip.compress(brotli.compress(BODY))
+    assert _fetch(payload, "br, gzip") == BODY
+
+
+def test_byte_accounting():
+    get_transfer_stats().clear()
+    _fetch(ENCODED["gzip"], "gzip")
+    stats = get_transfer_stats()["test"]
+    assert stats.wire_bytes == len(ENCODED["gzip"])
+    assert stats.decoded_bytes == len(BODY)
+    assert stats.last_encoding == "gzip"
+
+
+def test_etag_is_sent_after_commit_and_304_raises():
+    seen: list[str | None] = []
+
+    async def body():
+        yield BODY
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, content=body())
+
+    async def get(client: httpx.AsyncClient) -> bytes:
+        body = bytearray()
+        async with open_stream(client, "http://etag.test/", "etag") as s:
+            async for chunk in s:
+                body += chunk
+        return bytes(body)
+
+    async def run() -> None:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            assert await get(client) == BODY
+            # belum di-commit, jadi belum dikirim
+            assert await get(client) == BODY
+            commit_etag("http://etag.test/")
+            with pytest.raises(NotModified):
+                await get(client)
+
+    clear_etags()
+    asyncio.run(run())
+    clear_etags()
+    assert seen == [None, None, '"v1"']
+    assert get_transfer_stats()["etag"].not_modified == 1